@@ -0,0 +1,317 @@
+import os
+import json
+import sqlite3
+import argparse
+import threading
+
+# 人物卡存储后端。character.py 的缓存层只通过下列方法读写，具体存放方式可替换：
+#   load_card / save_card / delete_card   单张人物卡（dict，含 id/name/nickname/attributes）
+#   load_index / update_index             用户的人物卡名索引 { 人物卡ID: {"name", "nickname"} }
+#   load_current / save_current           用户当前选中的人物卡ID
+# group 为 None 表示未设置群组（旧版按用户存放的目录）。
+#
+# - JsonCardStore：chara_data/<群>/<用户>/<ID>.json + current.txt + cards.index（默认，兼容旧数据）
+# - SqliteCardStore：单个数据库文件，cards / attributes / current 三张表
+#
+# 从 JSON 目录迁移到 SQLite：
+#   python -m component.chara_store --from chara_data --to data/chara.db
+
+INDEX_FILE = "cards.index"
+CURRENT_FILE = "current.txt"
+
+
+def index_entry(data: dict) -> dict:
+    return {"name": data["name"], "nickname": data.get("nickname")}
+
+
+def _write_json_atomic(path: str, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class JsonCardStore:
+    """
+    每张人物卡一个 JSON 文件。
+    目录为 root/<group_id>/<user_id>，未设置群组时为 root/<user_id>。
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._known_folders = set()     # 已确认存在的用户目录
+
+    def user_folder(self, group, user_id) -> str:
+        if group is not None:
+            folder = os.path.join(self.root, str(group), str(user_id))
+        else:
+            folder = os.path.join(self.root, str(user_id))
+        if folder not in self._known_folders:
+            os.makedirs(folder, exist_ok=True)
+            self._known_folders.add(folder)
+        return folder
+
+    def card_path(self, group, user_id, chara_id) -> str:
+        return os.path.join(self.user_folder(group, user_id), f"{chara_id}.json")
+
+    def load_card(self, group, user_id, chara_id):
+        try:
+            with open(self.card_path(group, user_id, chara_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save_card(self, group, user_id, chara_id, data: dict):
+        _write_json_atomic(self.card_path(group, user_id, chara_id), data)
+
+    def delete_card(self, group, user_id, chara_id):
+        try:
+            os.remove(self.card_path(group, user_id, chara_id))
+        except FileNotFoundError:
+            pass
+
+    def _rebuild_index(self, group, user_id) -> dict:
+        folder = self.user_folder(group, user_id)
+        index = {}
+        for filename in os.listdir(folder):
+            if filename.endswith(".json"):
+                with open(os.path.join(folder, filename), "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                index[data["id"]] = index_entry(data)
+        return index
+
+    def load_index(self, group, user_id) -> dict:
+        """读取 cards.index；旧目录没有索引（或索引损坏）时扫描人物卡重建一次"""
+        path = os.path.join(self.user_folder(group, user_id), INDEX_FILE)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            index = self._rebuild_index(group, user_id)
+            _write_json_atomic(path, index)
+            return index
+
+    def update_index(self, group, user_id, index: dict, chara_id, entry):
+        # index 已由调用方更新，整体写回
+        _write_json_atomic(os.path.join(self.user_folder(group, user_id), INDEX_FILE), index)
+
+    def load_current(self, group, user_id):
+        try:
+            with open(os.path.join(self.user_folder(group, user_id), CURRENT_FILE), "r", encoding="utf-8") as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return None
+
+    def save_current(self, group, user_id, chara_id):
+        with open(os.path.join(self.user_folder(group, user_id), CURRENT_FILE), "w", encoding="utf-8") as f:
+            f.write(chara_id if chara_id is not None else "")
+
+    def iter_users(self):
+        """遍历目录中的全部用户，产生 (group, user_id)；直接含人物卡的目录视为未分群的用户目录"""
+        if not os.path.isdir(self.root):
+            return
+        for name in sorted(os.listdir(self.root)):
+            path = os.path.join(self.root, name)
+            if not os.path.isdir(path):
+                continue
+            entries = os.listdir(path)
+            if any(e.endswith(".json") or e == CURRENT_FILE for e in entries):
+                yield None, name
+                continue
+            for user in sorted(entries):
+                if os.path.isdir(os.path.join(path, user)):
+                    yield name, user
+
+    def close(self):
+        pass
+
+
+class SqliteCardStore:
+    """
+    全部人物卡存放在一个 SQLite 数据库中：
+      cards(chara_id, group_id, user_id, name, nickname, extra)   extra 为其余顶层字段的 JSON
+      attributes(chara_id, name, value)                             主键 (chara_id, name)，value 为 JSON，按 rowid 保持录入顺序
+      current(group_id, user_id, chara_id)
+    未设置群组时 group_id 存为空串。与 RuleRepository 相同，持有一个长连接（WAL），
+    连接会在 I/O 线程池中使用，所有操作由内部锁串行化。
+    """
+
+    _SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS cards("
+        " chara_id TEXT PRIMARY KEY, group_id TEXT NOT NULL, user_id TEXT NOT NULL,"
+        " name TEXT NOT NULL, nickname TEXT, extra TEXT NOT NULL DEFAULT '{}')",
+        "CREATE INDEX IF NOT EXISTS cards_owner ON cards(group_id, user_id)",
+        "CREATE TABLE IF NOT EXISTS attributes("
+        " chara_id TEXT NOT NULL, name TEXT NOT NULL, value TEXT NOT NULL,"
+        " PRIMARY KEY (chara_id, name))",
+        "CREATE TABLE IF NOT EXISTS current("
+        " group_id TEXT NOT NULL, user_id TEXT NOT NULL, chara_id TEXT,"
+        " PRIMARY KEY (group_id, user_id))",
+    )
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # caller must hold self._lock
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                for statement in self._SCHEMA:
+                    conn.execute(statement)
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _group(group) -> str:
+        return "" if group is None else str(group)
+
+    def load_card(self, group, user_id, chara_id):
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT name, nickname, extra FROM cards WHERE chara_id = ? AND group_id = ? AND user_id = ?",
+                (str(chara_id), self._group(group), str(user_id)),
+            ).fetchone()
+            if row is None:
+                return None
+            attrs = conn.execute("SELECT name, value FROM attributes WHERE chara_id = ? ORDER BY rowid",
+                                 (str(chara_id),)).fetchall()
+        name, nickname, extra = row
+        data = {"id": str(chara_id), "name": name}
+        if nickname is not None:
+            data["nickname"] = nickname
+        data.update(json.loads(extra))
+        if "attributes" not in data:
+            data["attributes"] = {k: json.loads(v) for k, v in attrs}
+        return data
+
+    def save_card(self, group, user_id, chara_id, data: dict):
+        extra = {k: v for k, v in data.items() if k not in ("id", "name", "nickname", "attributes")}
+        attributes = data.get("attributes", {})
+        if not isinstance(attributes, dict):
+            # 早期 .pc create 未给属性时存的是空串，原样放进 extra
+            extra["attributes"] = attributes
+            attributes = {}
+        attrs = [(str(chara_id), k, json.dumps(v, ensure_ascii=False)) for k, v in attributes.items()]
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cards(chara_id, group_id, user_id, name, nickname, extra) VALUES (?, ?, ?, ?, ?, ?)",
+                    (str(chara_id), self._group(group), str(user_id), data["name"], data.get("nickname"),
+                     json.dumps(extra, ensure_ascii=False)),
+                )
+                conn.execute("DELETE FROM attributes WHERE chara_id = ?", (str(chara_id),))
+                conn.executemany("INSERT INTO attributes(chara_id, name, value) VALUES (?, ?, ?)", attrs)
+
+    def delete_card(self, group, user_id, chara_id):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM cards WHERE chara_id = ? AND group_id = ? AND user_id = ?",
+                             (str(chara_id), self._group(group), str(user_id)))
+                conn.execute("DELETE FROM attributes WHERE chara_id = ?", (str(chara_id),))
+
+    def load_index(self, group, user_id) -> dict:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT chara_id, name, nickname FROM cards WHERE group_id = ? AND user_id = ?",
+                (self._group(group), str(user_id)),
+            ).fetchall()
+        return {chara_id: {"name": name, "nickname": nickname} for chara_id, name, nickname in rows}
+
+    def update_index(self, group, user_id, index: dict, chara_id, entry):
+        # 名字/昵称就是 cards 表的列；卡片尚未写入时由之后的 save_card 带上
+        if entry is None:
+            return
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("UPDATE cards SET name = ?, nickname = ? WHERE chara_id = ?",
+                             (entry["name"], entry.get("nickname"), str(chara_id)))
+
+    def load_current(self, group, user_id):
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT chara_id FROM current WHERE group_id = ? AND user_id = ?",
+                (self._group(group), str(user_id)),
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def save_current(self, group, user_id, chara_id):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO current(group_id, user_id, chara_id) VALUES (?, ?, ?)",
+                             (self._group(group), str(user_id), chara_id if chara_id is not None else ""))
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+STORE_TYPES = {
+    "json": JsonCardStore,
+    "sqlite": SqliteCardStore,
+}
+
+
+def open_store(kind: str, location: str):
+    """按名字创建存储后端；location 对 json 为根目录，对 sqlite 为数据库文件"""
+    try:
+        return STORE_TYPES[kind](location)
+    except KeyError:
+        raise ValueError(f"unknown character storage: {kind!r}") from None
+
+
+def migrate_json_to_sqlite(json_root: str, db_path: str) -> dict:
+    """
+    把 JSON 人物卡目录整体导入 SQLite（重复执行会覆盖同 ID 的人物卡）。
+    迁移应在插件停止时进行，避免缓存中尚未写回的修改丢失。
+    返回 {"users", "cards", "skipped"} 计数。
+    """
+    source = JsonCardStore(json_root)
+    target = SqliteCardStore(db_path)
+    counts = {"users": 0, "cards": 0, "skipped": 0}
+    try:
+        for group, user_id in source.iter_users():
+            counts["users"] += 1
+            folder = source.user_folder(group, user_id)
+            for filename in sorted(os.listdir(folder)):
+                if not filename.endswith(".json"):
+                    continue
+                try:
+                    with open(os.path.join(folder, filename), "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                    chara_id = data["id"]
+                    data["name"]
+                except (ValueError, KeyError, TypeError):
+                    counts["skipped"] += 1
+                    continue
+                target.save_card(group, user_id, chara_id, data)
+                counts["cards"] += 1
+            current = source.load_current(group, user_id)
+            if current is not None:
+                target.save_current(group, user_id, current)
+    finally:
+        target.close()
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migrate character cards from the JSON tree to SQLite.")
+    parser.add_argument("--from", dest="source", required=True, help="JSON card folder (chara_data)")
+    parser.add_argument("--to", dest="target", required=True, help="SQLite database file")
+    args = parser.parse_args(argv)
+    counts = migrate_json_to_sqlite(args.source, args.target)
+    print(f"migrated {counts['cards']} cards of {counts['users']} users, skipped {counts['skipped']}")
+
+
+if __name__ == "__main__":
+    main()
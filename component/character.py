@@ -1,75 +1,187 @@
 import os
-import json
+import copy
 import uuid
-import random
+import threading
+import contextvars
+from collections import OrderedDict
 
-from .output import get_output
+from .output import get_output, get_setting
+from .rng import get_random
+from .chara_store import open_store, index_entry
 
 PLUGIN_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_FOLDER = os.path.join(PLUGIN_DIR, "..", "chara_data")
 
+# 人物卡存储后端：json（默认，chara_data 下每卡一个文件）或 sqlite（单个数据库文件）。
+# 已有的 JSON 数据可用 `python -m component.chara_store --from chara_data --to data/chara.db` 迁移。
+CHARA_STORAGE = str(get_setting("chara_storage", "json")).lower()
+CHARA_DB_PATH = get_setting("chara_db_path") or os.path.join(PLUGIN_DIR, "..", "data", "chara.db")
+
 # 当前活动群组（由 main 在每条消息处理中设置），默认 None 表示全局/兼容旧行为
-_active_group = None
+# 用 ContextVar 保存：本模块的读写会被派发到 I/O 线程池，线程中读到的必须是发起调用的那条消息所在的群
+_active_group = contextvars.ContextVar("chara_active_group", default=None)
+
+# 人物卡缓存：按 (群, 用户, 人物卡ID) 缓存已读入的人物卡，LRU 淘汰。
+# save_character 只更新缓存并标记为脏，由 flush_characters()（main 定时调用）或被淘汰时写回存储，
+# 同一会话中反复的 .ra / .sc 检定只读内存。当前人物卡ID同样缓存，写入时直接落盘。
+CHARA_CACHE_SIZE = max(1, int(get_setting("chara_cache_size", 256)))
+CHARA_FLUSH_INTERVAL = float(get_setting("chara_flush_interval", 30))
+
+_card_cache = OrderedDict()     # { (group, user, chara_id): data }
+_dirty_cards = set()            # 尚未写回存储的缓存键
+_current_ids = {}               # { (group, user): chara_id 或 None }
+
+# 人物卡名索引 { 人物卡ID: {"name", "nickname"} }，由 save_character / delete_character 同步更新，
+# JSON 后端存为各用户目录下的 cards.index（旧目录首次访问时重建），SQLite 后端即 cards 表。
+_name_indexes = {}              # { (group, user): { chara_id: {"name", "nickname"} } }
+_cache_lock = threading.RLock()
+_store = None
+
+
+def get_store():
+    """当前的人物卡存储后端（首次使用时按配置创建）"""
+    global _store
+    if _store is None:
+        with _cache_lock:
+            if _store is None:
+                location = CHARA_DB_PATH if CHARA_STORAGE == "sqlite" else DATA_FOLDER
+                _store = open_store(CHARA_STORAGE, location)
+    return _store
+
+
+def set_store(store):
+    """换用指定的存储后端（当前后端先写回并关闭，各缓存清空），供检查脚本等在插件外使用"""
+    global _store
+    close_store()
+    with _cache_lock:
+        _card_cache.clear()
+        _dirty_cards.clear()
+        _current_ids.clear()
+        _name_indexes.clear()
+        _store = store
+
+
+def close_store():
+    """写回所有脏人物卡并关闭存储后端"""
+    global _store
+    flush_characters()
+    with _cache_lock:
+        if _store is not None:
+            _store.close()
+            _store = None
 
 
 def set_active_group(group_id):
-    global _active_group
-    _active_group = group_id
+    _active_group.set(group_id)
 
 
-def get_user_folder(user_id: str):
-    """
-    获取用户的人物卡存储文件夹路径，不存在则自动创建。
-    当_module_设置了活动群组时，路径为 DATA_FOLDER/<group_id>/<user_id>，否则为 DATA_FOLDER/<user_id>（兼容以前行为）。
-    """
-    if _active_group is not None:
-        folder = os.path.join(DATA_FOLDER, str(_active_group), str(user_id))
-    else:
-        folder = os.path.join(DATA_FOLDER, str(user_id))
-    os.makedirs(folder, exist_ok=True)
-    return folder
+def _group():
+    group_id = _active_group.get()
+    return None if group_id is None else str(group_id)
 
 
-def get_all_characters(user_id: str):
-    """
-    获取用户所有人物卡，返回 {人物卡名: 人物卡id} 字典。
-    """
-    folder = get_user_folder(user_id)
-    characters = {}
-    if not os.path.exists(folder):
-        return characters
-    for filename in os.listdir(folder):
-        if filename.endswith(".json"):
-            path = os.path.join(folder, filename)
-            with open(path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                characters[data["name"]] = data["id"]
-    return characters
-
-
-def get_character_file(user_id: str, chara_id: str):
+def _user_key(user_id: str):
+    return _group(), str(user_id)
+
+
+def _card_key(user_id: str, chara_id: str):
+    return _group(), str(user_id), str(chara_id)
+
+
+def _cache_card(key, data: dict, dirty: bool):
+    """放入缓存（调用方持有 _cache_lock）；超出容量时淘汰最久未用的，脏数据先写回"""
+    _card_cache[key] = data
+    _card_cache.move_to_end(key)
+    if dirty:
+        _dirty_cards.add(key)
+    while len(_card_cache) > CHARA_CACHE_SIZE:
+        old_key, old_data = _card_cache.popitem(last=False)
+        if old_key in _dirty_cards:
+            _dirty_cards.discard(old_key)
+            get_store().save_card(*old_key, old_data)
+
+
+def _cached_card(user_id: str, chara_id: str):
     """
-    获取指定人物卡的文件路径。
+    返回缓存中的人物卡（不复制，调用方不得修改）；未缓存时从存储读入。
     """
-    return os.path.join(get_user_folder(user_id), f"{chara_id}.json")
+    key = _card_key(user_id, chara_id)
+    with _cache_lock:
+        data = _card_cache.get(key)
+        if data is not None:
+            _card_cache.move_to_end(key)
+            return data
+        data = get_store().load_card(*key)
+        if data is not None:
+            # 旧格式人物卡就地升级，标记为脏以便写回缩小后的版本
+            _cache_card(key, data, dirty=upgrade_card(data))
+        return data
+
+
+def _load_index(user_id: str) -> dict:
+    """取用户的名索引（调用方持有 _cache_lock）"""
+    key = _user_key(user_id)
+    index = _name_indexes.get(key)
+    if index is None:
+        index = get_store().load_index(*key)
+        # 缓存中尚未写回的修改以缓存为准
+        for (g, u, cid), data in _card_cache.items():
+            if (g, u) == key:
+                index[cid] = index_entry(data)
+        _name_indexes[key] = index
+    return index
+
+
+def _update_index(user_id: str, chara_id: str, data: dict = None):
+    """更新名索引中的一项（data 为 None 表示删除），有变化时写回存储"""
+    with _cache_lock:
+        index = _load_index(user_id)
+        entry = index_entry(data) if data is not None else None
+        if index.get(chara_id) == entry:
+            return
+        if entry is None:
+            index.pop(chara_id, None)
+        else:
+            index[chara_id] = entry
+        get_store().update_index(*_user_key(user_id), index, chara_id, entry)
+
+
+def flush_characters() -> int:
+    """把所有脏人物卡写回存储，返回写回的数量"""
+    with _cache_lock:
+        entries = [(key, _card_cache[key]) for key in _dirty_cards if key in _card_cache]
+        _dirty_cards.clear()
+        for key, data in entries:
+            get_store().save_card(*key, data)
+    return len(entries)
+
 
+def character_cache_stats():
+    with _cache_lock:
+        return {"size": len(_card_cache), "maxsize": CHARA_CACHE_SIZE, "dirty": len(_dirty_cards)}
 
-def get_current_character_file(user_id: str):
+
+def get_all_characters(user_id: str):
     """
-    获取当前选中人物卡的记录文件路径。
+    获取用户所有人物卡，返回 {人物卡名: 人物卡id} 字典（来自名索引，不读人物卡）。
     """
-    return os.path.join(get_user_folder(user_id), "current.txt")
+    with _cache_lock:
+        index = _load_index(user_id)
+        return {entry["name"]: chara_id for chara_id, entry in index.items()}
 
 
 def get_current_character_id(user_id: str):
     """
     获取当前选中的人物卡ID。
     """
-    path = get_current_character_file(user_id)
-    if os.path.exists(path):
-        with open(path, "r", encoding="utf-8") as f:
-            return f.read().strip()
-    return None
+    key = _user_key(user_id)
+    with _cache_lock:
+        if key in _current_ids:
+            return _current_ids[key]
+    chara_id = get_store().load_current(*key)
+    with _cache_lock:
+        _current_ids[key] = chara_id
+    return chara_id
 
 
 def get_current_character(user_id: str):
@@ -84,139 +196,208 @@ def get_current_character(user_id: str):
 
 def set_current_character(user_id: str, chara_id: str):
     """
-    设置当前选中的人物卡ID，写入current.txt。
+    设置当前选中的人物卡ID。
     """
-    with open(get_current_character_file(user_id), "w", encoding="utf-8") as f:
-        f.write(chara_id if chara_id is not None else "")
+    key = _user_key(user_id)
+    get_store().save_current(*key, chara_id)
+    with _cache_lock:
+        _current_ids[key] = chara_id or ""
 
 
 def load_character(user_id: str, chara_id: str):
     """
     加载指定人物卡的数据（字典），不存在则返回None。
+    返回缓存数据的副本，调用方修改后需 save_character 才会生效。
     """
-    path = get_character_file(user_id, chara_id)
-    if os.path.exists(path):
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return None
+    if not chara_id:
+        return None
+    data = _cached_card(user_id, chara_id)
+    return copy.deepcopy(data) if data is not None else None
+
+
+# 同义词组（每组第一个为“代表/优先检查字段”），保存人物卡时组内所有字段保持同一值
+SYNONYMS = [
+    ["力量", "str"],
+    ["敏捷", "dex"],
+    ["意志", "pow"],
+    ["体质", "con"],
+    ["外貌", "app"],
+    ["教育", "知识", "edu"],
+    ["体型", "siz"],
+    ["智力", "灵感", "int"],
+    ["san", "san值", "理智", "理智值"],
+    ["幸运", "运气"],
+    ["mp", "魔法"],
+    ["hp", "体力", "max_hp"],
+    ["max_san"],
+
+    # 技能/替代名（根据你给出的列表合并）
+    ["计算机", "计算机使用", "电脑"],
+    ["会计"],
+    ["人类学"],
+    ["估价"],
+    ["考古学"],
+    ["取悦"],
+    ["攀爬"],
+    ["电脑", "计算机"],  # 重复安全
+    ["信用", "信誉", "信用评级"],
+    ["克苏鲁", "克苏鲁神话", "cm"],
+    ["乔装"],
+    ["闪避"],
+    ["汽车", "驾驶", "汽车驾驶"],
+    ["电气维修"],
+    ["电子学"],
+    ["话术"],
+    ["斗殴"],
+    ["手枪"],
+    ["急救"],
+    ["历史"],
+    ["恐吓"],
+    ["跳跃"],
+    ["拉丁语"],
+    ["母语"],
+    ["法律"],
+    ["图书馆", "图书馆使用"],
+    ["聆听"],
+    ["开锁", "撬锁", "锁匠"],
+    ["机械维修"],
+    ["医学"],
+    ["博物学", "自然学"],
+    ["领航", "导航"],
+    ["神秘学"],
+    ["重型操作", "重型机械", "操作重型机械", "重型"],
+    ["说服"],
+    ["精神分析"],
+    ["心理学"],
+    ["骑术"],
+    ["妙手"],
+    ["侦查"],
+    ["潜行"],
+    ["生存"],
+    ["游泳"],
+    ["投掷"],
+    ["追踪"],
+    ["驯兽"],
+    ["潜水"],
+    ["爆破"],
+    ["读唇"],
+    ["催眠"],
+    ["炮术"],
+    ["max_hp"],  # 已包含在 hp 组，但再列一次无伤
+    ["max_san"],  # 同上
+]
+
+
+def _compile_synonyms(groups):
+    """
+    把同义词组编译为 { 字段: 所在组(tuple) }，导入时执行一次。
+    有共同字段的组合并为一组（如 电脑 / 计算机），只有一个字段的组无需同步，不收录。
+    """
+    alias_groups = {}
+    for group in groups:
+        merged = []
+        for key in group:
+            for k in alias_groups.get(key, (key,)):
+                if k not in merged:
+                    merged.append(k)
+        merged = tuple(merged)
+        if len(merged) > 1:
+            for k in merged:
+                alias_groups[k] = merged
+    return alias_groups
 
 
-def save_character(user_id: str, chara_id: str, data: dict):
+ALIAS_GROUPS = _compile_synonyms(SYNONYMS)
+# 人物卡中每个属性只存一个规范字段（组内第一个），其余同义词在读取时解析：{ 同义词: 规范字段 }
+CANONICAL = {k: group[0] for k, group in ALIAS_GROUPS.items() if group[0] != k}
+
+
+def canonical_name(name: str) -> str:
+    """属性名对应的规范字段（不在同义词表中的原样返回）"""
+    return CANONICAL.get(name, name)
+
+
+def get_attribute(attributes: dict, name: str, default=0):
+    """按同义词解析读取属性，如 get_attribute(attrs, "con") 读取 体质"""
+    return attributes.get(canonical_name(name), default)
+
+
+def _changed_keys(container: dict, original):
+    """container 中相对 original 新增或改变了值的字段"""
+    return {k for k, v in container.items() if k not in original or original[k] != v}
+
+
+def _canonicalize(container: dict, changed=None) -> bool:
     """
-    保存人物卡数据到文件，并在写回前把常见同义词组同步更新。
-    同义词组中任意一个字段在某个容器（data 或其子 dict）存在时，
-    将把该容器内所有同义词字段更新为该出现字段的值。
+    把同义词字段改名为规范字段，保持原有顺序；返回是否有改动。
+    changed 为 None 时检查全部字段，同一属性出现多次时保留先出现的；
+    否则只检查 changed 中的字段（已规范化的人物卡上只有它们可能是同义词），且它们的值优先。
     """
-    path = get_character_file(user_id, chara_id)
-
-    # 同义词组（每组第一个为“代表/优先检查字段”，但最终会把组内所有字段设为同一值）
-    SYNONYMS = [
-        ["力量", "str"],
-        ["敏捷", "dex"],
-        ["意志", "pow"],
-        ["体质", "con"],
-        ["外貌", "app"],
-        ["教育", "知识", "edu"],
-        ["体型", "siz"],
-        ["智力", "灵感", "int"],
-        ["san", "san值", "理智", "理智值"],
-        ["幸运", "运气"],
-        ["mp", "魔法"],
-        ["hp", "体力", "max_hp"],
-        ["max_san"],
-
-        # 技能/替代名（根据你给出的列表合并）
-        ["计算机", "计算机使用", "电脑"],
-        ["会计"],
-        ["人类学"],
-        ["估价"],
-        ["考古学"],
-        ["取悦"],
-        ["攀爬"],
-        ["电脑", "计算机"],  # 重复安全
-        ["信用", "信誉", "信用评级"],
-        ["克苏鲁", "克苏鲁神话", "cm"],
-        ["乔装"],
-        ["闪避"],
-        ["汽车", "驾驶", "汽车驾驶"],
-        ["电气维修"],
-        ["电子学"],
-        ["话术"],
-        ["斗殴"],
-        ["手枪"],
-        ["急救"],
-        ["历史"],
-        ["恐吓"],
-        ["跳跃"],
-        ["拉丁语"],
-        ["母语"],
-        ["法律"],
-        ["图书馆", "图书馆使用"],
-        ["聆听"],
-        ["开锁", "撬锁", "锁匠"],
-        ["机械维修"],
-        ["医学"],
-        ["博物学", "自然学"],
-        ["领航", "导航"],
-        ["神秘学"],
-        ["重型操作", "重型机械", "操作重型机械", "重型"],
-        ["说服"],
-        ["精神分析"],
-        ["心理学"],
-        ["骑术"],
-        ["妙手"],
-        ["侦查"],
-        ["潜行"],
-        ["生存"],
-        ["游泳"],
-        ["投掷"],
-        ["追踪"],
-        ["驯兽"],
-        ["潜水"],
-        ["爆破"],
-        ["读唇"],
-        ["催眠"],
-        ["炮术"],
-        ["max_hp"],  # 已包含在 hp 组，但再列一次无伤
-        ["max_san"],  # 同上
-    ]
-
-    # helper: 给单个容器（dict）同步同义词组
-    def sync_container(container: dict):
-        if not isinstance(container, dict):
-            return
-        for group in SYNONYMS:
-            # 查找组内在容器中存在的键（保留顺序）
-            present_keys = [k for k in group if k in container]
-            if not present_keys:
-                continue
-            # 以第一个出现的键的值作为统一值
-            value = container[present_keys[0]]
-            # 将组中所有键都写回该值（无则新增）
-            for k in group:
-                container[k] = value
-
-    # 对主 data 同步
-    sync_container(data)
-
-    # 对 data 下的所有直接子 dict 也同步（常见的 attributes/skills 等）
-    for k, v in list(data.items()):
+    if not any(k in CANONICAL for k in (container if changed is None else changed)):
+        return False
+    changed = changed or ()
+    result = {}
+    for k, v in container.items():
+        canon = CANONICAL.get(k, k)
+        if canon not in result or k in changed:
+            result[canon] = v
+    container.clear()
+    container.update(result)
+    return True
+
+
+def upgrade_card(data: dict) -> bool:
+    """
+    把旧格式人物卡（每个同义词各存一份）就地改为只存规范字段，返回是否有改动。
+    从存储读入人物卡时自动执行，改动过的人物卡随下次写回缩小。
+    """
+    upgraded = _canonicalize(data)
+    for v in data.values():
         if isinstance(v, dict):
-            sync_container(v)
+            upgraded = _canonicalize(v) or upgraded
+    return upgraded
 
-    # 最后写回文件
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+
+def save_character(user_id: str, chara_id: str, data: dict):
+    """
+    保存人物卡数据，同义词字段改为对应的规范字段存储。
+    只检查相对缓存中原版新增或改变的字段，保存的开销与修改量成正比。
+    新建人物卡或名字/昵称改变时，先把人物卡写入存储、再更新名索引，
+    存储中的名索引总与已落盘的人物卡一致；其余修改只进缓存。
+    """
+    key = _card_key(user_id, chara_id)
+    with _cache_lock:
+        original = _card_cache.get(key)
+        if original is None:
+            upgrade_card(data)
+        else:
+            # 对主 data 及其直接子 dict（常见的 attributes/skills 等）处理
+            _canonicalize(data, _changed_keys(data, original))
+            for k, v in data.items():
+                if isinstance(v, dict):
+                    sub = original.get(k)
+                    _canonicalize(v, _changed_keys(v, sub) if isinstance(sub, dict) else None)
+
+        # 先载入名索引：索引首次载入时会合并缓存中的人物卡，须在新卡放入缓存之前比较
+        write_through = _load_index(user_id).get(chara_id) != index_entry(data)
+        # 其余修改写入缓存并标记为脏，由 flush_characters() 或缓存淘汰时写回存储
+        cached = copy.deepcopy(data)
+        _cache_card(key, cached, dirty=not write_through)
+        if write_through:
+            _dirty_cards.discard(key)
+            get_store().save_card(*key, cached)
+            _update_index(user_id, chara_id, data)
 
 
 def get_skill_value(user_id: str, skill_name: str):
     """
-    获取当前选中人物卡的某项技能值，不存在则返回0。
+    获取当前选中人物卡的某项技能值（支持同义词），不存在则返回0。
     """
-    chara_data = get_current_character(user_id)
-    if not chara_data or skill_name not in chara_data["attributes"]:
+    chara_id = get_current_character_id(user_id)
+    chara_data = _cached_card(user_id, chara_id) if chara_id else None
+    if not chara_data or not isinstance(chara_data["attributes"], dict):
         return 0
-    return chara_data["attributes"][skill_name]
+    return get_attribute(chara_data["attributes"], skill_name)
 
 def create_character(user_id: str, name: str, attributes: dict):
     """
@@ -225,6 +406,7 @@ def create_character(user_id: str, name: str, attributes: dict):
     """
     chara_id = str(uuid.uuid4())
     data = {"id": chara_id, "name": name, "attributes": attributes}
+    # 新人物卡立即落盘（先写卡、后写索引），中途出错时索引里不会留下没有人物卡的项
     save_character(user_id, chara_id, data)
     set_current_character(user_id, chara_id)
     return chara_id
@@ -233,7 +415,7 @@ def create_character(user_id: str, name: str, attributes: dict):
 def delete_character(user_id: str, name: str):
     """
     删除指定名字的人物卡。
-    若删除的是当前人物卡，则清空current.txt。
+    若删除的是当前人物卡，则清空当前选择。
     返回 (是否成功, 被删除人物卡ID)。
     """
     characters = get_all_characters(user_id)
@@ -241,11 +423,12 @@ def delete_character(user_id: str, name: str):
     if name not in characters:
         return False, None
     chara_to_delete_id = characters[name]
-    path = get_character_file(user_id, chara_to_delete_id)
-    try:
-        os.remove(path)
-    except FileNotFoundError:
-        return False, None
+    key = _card_key(user_id, chara_to_delete_id)
+    with _cache_lock:
+        _card_cache.pop(key, None)
+        _dirty_cards.discard(key)
+        _update_index(user_id, chara_to_delete_id, None)
+        get_store().delete_card(*key)
     if chara_to_delete_id == chara_id:
         set_current_character(user_id, None)
     return True, chara_to_delete_id
@@ -267,6 +450,7 @@ def grow_up(user_id: str, skill_name: str, skill_value: int = None):
     技能成长判定（COC规则）
     不依赖 event，返回结果字符串，由调用端处理发送。
     """
+    rng = get_random()
     update_skill_value = False
 
     # 如果未提供 skill_value，则从当前人物卡读取
@@ -286,17 +470,17 @@ def grow_up(user_id: str, skill_name: str, skill_value: int = None):
         return get_output("pc.show.attr_missing", skill_name=skill_name)
 
     # 掷骰
-    tens_digit = random.randint(0, 9)
-    ones_digit = random.randint(0, 9)
+    tens_digit = rng.randint(0, 9)
+    ones_digit = rng.randint(0, 9)
     roll_result = 100 if (tens_digit == 0 and ones_digit == 0) else (tens_digit * 10 + ones_digit)
 
     # 成长判定：roll > skill_value 或 roll > 95 成长
     if roll_result > skill_value or roll_result > 95:
-        en_value = random.randint(1, 10)
+        en_value = rng.randint(1, 10)
         new_value = skill_value + en_value
         result = get_output("pc.grow.success", skill_name=skill_name, skill_value=skill_value, en_value=en_value, new_value = new_value)
         if update_skill_value:
-            chara_data["attributes"][skill_name] = skill_value + en_value
+            chara_data["attributes"][canonical_name(skill_name)] = skill_value + en_value
             save_character(user_id, chara_id, chara_data)
     else:
         result = get_output("pc.grow.failure")
@@ -1,16 +1,18 @@
-import random
 import re
 import datetime
 import hashlib
 
 from .output import get_output
-from .rules import great_success_range, great_failure_range, get_great_sf_rule, set_great_sf_rule, GREAT_SF_RULE_DEFAULT, GREAT_SF_RULE_STR
+from .dice_expr import compile_expression, iter_dice, Const, DiceTerm, OPERATORS
+from . import roll_backend
+from .rules import great_success_range, classify_roll, get_great_sf_rule, set_great_sf_rule, GREAT_SF_RULE_DEFAULT, GREAT_SF_RULE_STR
+from .rng import get_random
 
 DEFAULT_DICE = 100
 
 def roll_dice(dice_count, dice_faces):
     """掷 `dice_count` 个 `dice_faces` 面骰"""
-    return [random.randint(1, dice_faces) for _ in range(dice_count)]
+    return roll_backend.draw(dice_count, dice_faces)
 
 def roll_coc_bonus_penalty(base_roll, bonus_dice=0, penalty_dice=0):
     """奖励骰 / 惩罚骰"""
@@ -19,9 +21,10 @@ def roll_coc_bonus_penalty(base_roll, bonus_dice=0, penalty_dice=0):
     if ones_digit == 0:
         ones_digit = 10
 
+    rng = get_random()
     alternatives = []
     for _ in range(max(bonus_dice, penalty_dice)):
-        new_tens = random.randint(0, 9)
+        new_tens = rng.randint(0, 9)
         alternatives.append(new_tens * 10 + ones_digit)
 
     if bonus_dice > 0:
@@ -30,159 +33,127 @@ def roll_coc_bonus_penalty(base_roll, bonus_dice=0, penalty_dice=0):
         return max([base_roll] + alternatives)
     return base_roll
 
+def _is_coc_bonus_term(term, program):
+    return term.count == 1 and term.faces == 100 and (program.bonus_dice > 0 or program.penalty_dice > 0)
+
+
+def _roll_term(term, pool, bonus_dice=0, penalty_dice=0):
+    """
+    掷一个骰子项，返回 (数值, 格式化文本)；吸血鬼骰的数值为 None。
+    pool 为 roll_backend.roll_pools 预先掷好的一组结果（奖励/惩罚骰为 None）。
+    """
+    rng = get_random()
+    dice_count = term.count
+    dice_faces = term.faces
+    keep_highest = term.keep
+    vampire_difficulty = term.vampire
+
+    # COC 奖励/惩罚骰
+    if pool is None:
+        base_tens = rng.randint(0, 9)
+        unit = rng.randint(0, 9)
+        rolls = [rng.randint(0, 9) for _ in range(1 + max(bonus_dice, penalty_dice))]
+        if bonus_dice > 0:
+            final_tens = min(rolls[:1 + bonus_dice])
+            roll_type = "奖励骰"
+        else:
+            final_tens = max(rolls[:1 + penalty_dice])
+            roll_type = "惩罚骰"
+        subtotal = final_tens * 10 + unit
+        return subtotal, f"1d100 = [D100: {base_tens * 10 + unit}, {roll_type}: {', '.join(map(str, rolls))}] → {subtotal}"
+
+    rolls, sorted_rolls, value = pool
+
+    if vampire_difficulty:
+        success_num, super_failure = value
+        roll_result = f"难度为{vampire_difficulty}的{dice_count}次掷骰 = [{', '.join(map(str, sorted_rolls))}]"
+        if success_num > 0:
+            roll_result += f"，成功！成功数为{success_num}"
+        elif super_failure:
+            roll_result += "，大失败！"
+        else:
+            roll_result += "，失败！"
+        return None, roll_result  # 吸血鬼骰不返回总和
+
+    # 普通骰子
+    subtotal = value
+
+    if keep_highest < dice_count:
+        kept = " ".join(map(str, sorted_rolls[:keep_highest]))
+        dropped = " ".join(map(str, sorted_rolls[keep_highest:]))
+        return subtotal, f"{dice_count}d{dice_faces}k{keep_highest}={subtotal} [{kept} | {dropped}]"
+    return subtotal, f"{dice_count}d{dice_faces}={subtotal} [{' + '.join(map(str, rolls))}]"
+
+
+def _roll_node(node, program, pools):
+    """
+    对语法树求值，返回 (数值, 格式化文本)。
+    含吸血鬼骰的表达式不计算数值（返回 None），只拼接各项结果。
+    pools: { id(骰子项): 该项各次重复的预掷结果迭代器 }
+    """
+    if isinstance(node, Const):
+        return node.value, f"{node.value}"
+    if isinstance(node, DiceTerm):
+        pool = next(pools[id(node)]) if id(node) in pools else None
+        return _roll_term(node, pool, program.bonus_dice, program.penalty_dice)
+
+    left, left_text = _roll_node(node.left, program, pools)
+    right, right_text = _roll_node(node.right, program, pools)
+    text = f"{left_text}  {node.op} {right_text}"
+    if node.paren:
+        text = f"({text})"
+    if program.vampire:
+        return None, text
+    return OPERATORS[node.op](left, right), text
+
+
 def parse_dice_expression(expression):
     """
     解析骰子表达式，并格式化输出。
-    支持普通骰、奖励/惩罚骰、吸血鬼骰等。
+    支持普通骰、奖励/惩罚骰、吸血鬼骰，以及 + - * / 与括号组成的四则运算。
+    `N#` 重复掷骰时，总和为各次结果的累加。
     返回 (总和, 格式化字符串)
     """
-    expression = expression.replace("x", "*").replace("X", "*")
+    program = compile_expression(expression)
+    if program.error:
+        return None, program.error
 
-    match_repeat = re.match(r"(\d+)?#(.+)", expression) # Match 3#2d20
-    roll_times = 1
-    bonus_dice = 0
-    penalty_dice = 0
-
-    if match_repeat:    # Matched: roll group(2) for group(1) times
-        roll_times = int(match_repeat.group(1)) if match_repeat.group(1) else 1
-        expression = match_repeat.group(2)
-
-        if expression in ["p", "b"]:
-            penalty_dice = 1 if expression == "p" else 0
-            bonus_dice = 1 if expression == "b" else 0
-            expression = "1d100"
+    # 每个骰子项的全部重复一次性掷出（NumPy 可用时为一次向量化调用）
+    pools = {
+        id(term): iter(roll_backend.roll_pools(program.roll_times, term.count, term.faces, term.keep, term.vampire))
+        for term in iter_dice(program.root) if not _is_coc_bonus_term(term, program)
+    }
 
     results = []
     total = None
-    for _ in range(roll_times):
-        parts = re.split(r"([+\-*])", expression)
-        subtotal = None
-        formatted_parts = []
-
-        for i in range(0, len(parts), 2):
-            expr = parts[i].strip()
-            operator = parts[i - 1] if i > 0 else "+"
-
-            if expr.isdigit():
-                subtotal = int(expr)
-                roll_result = f"{subtotal}"
-            else:
-                match = re.match(r"(\d*)d(\d+)(k\d+)?([+\-*]\d+)?(v(\d+)?)?", expr)
-                if not match:
-                    return None, f"⚠️ 格式错误 `{expr}`"
-
-                dice_count = int(match.group(1)) if match.group(1) else 1
-                dice_faces = int(match.group(2))
-                keep_highest = int(match.group(3)[1:]) if match.group(3) else dice_count
-                modifier = match.group(4)
-                vampire_difficulty = (int(match.group(6)) if match.group(5) and match.group(5).strip() != "v" else 6) if match.group(5) else None
-
-                if not (1 <= dice_count <= 100 and 1 <= dice_faces <= 1000):
-                    return None, "⚠️ 骰子个数 1-100，面数 1-1000，否则非法！"
-
-                # COC 奖励/惩罚骰
-                if dice_count == 1 and dice_faces == 100 and (bonus_dice > 0 or penalty_dice > 0):
-                    base_tens = random.randint(0, 9)
-                    unit = random.randint(0, 9)
-                    rolls = [random.randint(0, 9) for _ in range(1 + max(bonus_dice, penalty_dice))]
-                    if bonus_dice > 0:
-                        final_tens = min(rolls[:1 + bonus_dice])
-                        roll_type = "奖励骰"
-                    else:
-                        final_tens = max(rolls[:1 + penalty_dice])
-                        roll_type = "惩罚骰"
-                    subtotal = final_tens * 10 + unit
-                    roll_result = f"{expr} = [D100: {base_tens * 10 + unit}, {roll_type}: {', '.join(map(str, rolls))}] → {subtotal}"
-
-                elif vampire_difficulty:
-                    rolls = [random.randint(1, dice_faces) for _ in range(dice_count)]
-                    sorted_rolls = sorted(rolls, reverse=True)
-                    success_num = 0
-                    failure_flag = False
-                    success_flag = False
-                    super_failure = False
-
-                    for a_roll in sorted_rolls:
-                        if a_roll == 1:
-                            success_num -= 1
-                            failure_flag = True
-                        elif a_roll >= vampire_difficulty:
-                            success_num += 1
-                            success_flag = True
-                    if failure_flag and not success_flag:
-                        super_failure = True
-
-                    roll_result = f"难度为{vampire_difficulty}的{dice_count}次掷骰 = [{', '.join(map(str, sorted_rolls))}]"
-                    if success_num > 0:
-                        roll_result += f"，成功！成功数为{success_num}"
-                    elif super_failure:
-                        roll_result += "，大失败！"
-                    else:
-                        roll_result += "，失败！"
-                    subtotal = None  # 吸血鬼骰不返回总和
-
-                else:
-                    # 普通骰子
-                    rolls = [random.randint(1, dice_faces) for _ in range(dice_count)]
-                    sorted_rolls = sorted(rolls, reverse=True)
-                    selected_rolls = sorted_rolls[:keep_highest]
-                    subtotal_before_mod = sum(selected_rolls)
-
-                    if keep_highest < dice_count:
-                        kept = " ".join(map(str, sorted_rolls[:keep_highest]))
-                        dropped = " ".join(map(str, sorted_rolls[keep_highest:]))
-                        roll_result = f"{dice_count}d{dice_faces}k{keep_highest}={subtotal_before_mod} [{kept} | {dropped}]"
-                    else:
-                        roll_result = f"{dice_count}d{dice_faces}={subtotal_before_mod} [{' + '.join(map(str, rolls))}]"
-
-                    if modifier:
-                        try:
-                            subtotal = eval(f"{subtotal_before_mod}{modifier}")
-                            roll_result = f"{dice_count}d{dice_faces}{modifier}={subtotal_before_mod} [{' + '.join(map(str, rolls))}] {modifier} = {subtotal}"
-                        except:
-                            return None, f"⚠️ 修正值 `{modifier}` 无效！"
-                    else:
-                        subtotal = subtotal_before_mod
-
-            # 计算表达式
-            if not vampire_difficulty:
-                if total is None:
-                    total = subtotal
-                else:
-                    if operator == "+":
-                        total += subtotal
-                    elif operator == "-":
-                        total -= subtotal
-                    elif operator == "*":
-                        total *= subtotal
-
-            # 存储格式化骰子结果
-            if i == 0:
-                formatted_parts.append(f"{roll_result}")
-            else:
-                formatted_parts.append(f"{operator} {roll_result}")
+    for _ in range(program.roll_times):
+        try:
+            value, text = _roll_node(program.root, program, pools)
+        except ZeroDivisionError:
+            return None, "⚠️ 除数不能为 0！"
 
         # 最终格式化输出
-        if not vampire_difficulty:
-            final_result = f"{'  '.join(formatted_parts)} = {total}"
-            results.append(f"{final_result}")
+        if program.vampire:
+            results.append(text)
         else:
-            final_result = f"{'  '.join(formatted_parts)}"
-            results.append(f"{final_result}")
+            total = value if total is None else total + value
+            results.append(f"{text} = {total}")
 
     return total, "\n".join(results)
 
+
 def roll_attribute(skill_name, skill_value, group_id, name):
     """
     普通技能判定
     """
+    rng = get_random()
     try:
         skill_value = int(skill_value)
     except ValueError:
         return get_output("skill_check.error.normal", skill_name=skill_name)
 
-    tens_digit = random.randint(0, 9)
-    ones_digit = random.randint(0, 9)
+    tens_digit = rng.randint(0, 9)
+    ones_digit = rng.randint(0, 9)
     roll_result = 100 if (tens_digit == 0 and ones_digit == 0) else (tens_digit * 10 + ones_digit)
 
     # 这里建议 get_roll_result 也迁移到 dice.py 或 rules.py
@@ -201,15 +172,16 @@ def roll_attribute_penalty(dice_count, skill_name, skill_value, group_id, name):
     """
     技能判定（惩罚骰）
     """
+    rng = get_random()
     try:
         dice_count = int(dice_count)
         skill_value = int(skill_value)
     except ValueError:
         return get_output("skill_check.error.penalty", skill_name=skill_name)
 
-    ones_digit = random.randint(0, 9)
-    new_tens_digits = [random.randint(0, 9) for _ in range(dice_count)]
-    new_tens_digits.append(random.randint(0, 9))
+    ones_digit = rng.randint(0, 9)
+    new_tens_digits = [rng.randint(0, 9) for _ in range(dice_count)]
+    new_tens_digits.append(rng.randint(0, 9))
 
     if 0 in new_tens_digits and ones_digit == 0:
         final_y = 100
@@ -233,15 +205,16 @@ def roll_attribute_bonus(dice_count, skill_name, skill_value, group_id, name):
     """
     技能判定（奖励骰）
     """
+    rng = get_random()
     try:
         dice_count = int(dice_count)
         skill_value = int(skill_value)
     except ValueError:
         return get_output("skill_check.error.bonus", skill_name=skill_name)
 
-    ones_digit = random.randint(0, 9)
-    new_tens_digits = [random.randint(0, 9) for _ in range(dice_count)]
-    new_tens_digits.append(random.randint(0, 9))
+    ones_digit = rng.randint(0, 9)
+    new_tens_digits = [rng.randint(0, 9) for _ in range(dice_count)]
+    new_tens_digits.append(rng.randint(0, 9))
 
     filtered_tens = [tens for tens in new_tens_digits if not (tens == 0 and ones_digit == 0)]
     if not filtered_tens:
@@ -310,19 +283,10 @@ def get_roll_result(name: str, roll_result: int, skill_value: int, group: str):
     if great_success_range(50, rule)[0] <= 0:
         set_great_sf_rule(GREAT_SF_RULE_DEFAULT, group)
         validation_prefix += get_output("coc_roll.results.reset", rule=GREAT_SF_RULE_STR[GREAT_SF_RULE_DEFAULT])
+        rule = GREAT_SF_RULE_DEFAULT
 
-    if roll_result in great_success_range(skill_value, rule):
-        return validation_prefix + get_output("coc_roll.results.great_success", name=name)
-    elif roll_result <= skill_value / 5:
-        return validation_prefix + get_output("coc_roll.results.extreme_success", name=name)
-    elif roll_result <= skill_value / 2:
-        return validation_prefix + get_output("coc_roll.results.hard_success", name=name)
-    elif roll_result <= skill_value:
-        return validation_prefix + get_output("coc_roll.results.success", name=name)
-    elif roll_result in great_failure_range(skill_value, rule):
-        return validation_prefix + get_output("coc_roll.results.great_failure", name=name)
-    else:
-        return validation_prefix + get_output("coc_roll.results.failure", name=name)
+    tier = classify_roll(roll_result, skill_value, rule)
+    return validation_prefix + get_output(f"coc_roll.results.{tier}", name=name)
 
 def fireball(ring: int = 3):
     """
@@ -330,7 +294,8 @@ def fireball(ring: int = 3):
     """
     if ring < 3:
         return get_output("fireball.low")
-    rolls = [random.randint(1, 6) for _ in range(8 + (ring - 3))]
+    rng = get_random()
+    rolls = [rng.randint(1, 6) for _ in range(8 + (ring - 3))]
     total_sum = sum(rolls)
     damage_breakdown = " + ".join(map(str, rolls))
     return get_output(
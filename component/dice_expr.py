@@ -0,0 +1,214 @@
+import re
+import operator as _operator
+from functools import lru_cache
+
+# 掷骰表达式编译：把表达式字符串编译成 DiceProgram（语法树），
+# 编译结果按规范化后的字符串做 LRU 缓存，重复的 .r 1d100 / .r 3d6+2 不再重新解析。
+#
+# 语法（按优先级从低到高）：
+#   expr   := term (("+" | "-") term)*
+#   term   := factor (("*" | "/") factor)*
+#   factor := 数字 | 骰子 | "(" expr ")"
+#   骰子   := [个数]d面数[k保留个数][v[难度]]
+# 除法为向下取整的整数除法。只含常数的子树在编译期直接折叠为常数。
+
+COMPILE_CACHE_SIZE = 512
+
+MAX_DICE_COUNT = 100
+MAX_DICE_FACES = 1000
+
+_REPEAT_RE = re.compile(r"(\d+)?#(.+)")  # Match 3#2d20
+_TOKEN_RE = re.compile(r"([+\-*/()])")
+_DICE_RE = re.compile(r"(\d*)d(\d+)(k\d+)?(v(\d+)?)?")
+
+OPERATORS = {
+    "+": _operator.add,
+    "-": _operator.sub,
+    "*": _operator.mul,
+    "/": _operator.floordiv,
+}
+
+
+class DiceExpressionError(ValueError):
+    """表达式无法编译，str(e) 为给用户看的错误文本"""
+
+
+class Const:
+    """常数（含编译期折叠得到的常数）"""
+    __slots__ = ("value", "paren")
+
+    def __init__(self, value: int):
+        self.value = value
+        self.paren = False
+
+
+class DiceTerm:
+    """
+    骰子项，如 `4d6k3`、`5d10v7`。
+    - keep: 保留最高的骰子个数（未指定时等于骰子个数）
+    - vampire: 吸血鬼规则难度，None 表示普通骰
+    """
+    __slots__ = ("count", "faces", "keep", "vampire", "paren")
+
+    def __init__(self, count: int, faces: int, keep: int, vampire):
+        self.count = count
+        self.faces = faces
+        self.keep = keep
+        self.vampire = vampire
+        self.paren = False
+
+
+class BinOp:
+    """二元运算 left <op> right；paren 表示原表达式中带括号，格式化时保留"""
+    __slots__ = ("op", "left", "right", "paren")
+
+    def __init__(self, op: str, left, right):
+        self.op = op
+        self.left = left
+        self.right = right
+        self.paren = False
+
+
+class DiceProgram:
+    """
+    编译后的表达式。
+    - roll_times: `N#` 重复次数
+    - bonus_dice / penalty_dice: `#b` / `#p` 的奖励/惩罚骰个数
+    - root: 语法树根节点
+    - vampire: 是否含吸血鬼骰（此时只输出掷骰结果，不计算总和）
+    - error: 编译失败时的错误文本，此时 root 为 None
+    """
+    __slots__ = ("roll_times", "bonus_dice", "penalty_dice", "root", "vampire", "error")
+
+    def __init__(self, roll_times=1, bonus_dice=0, penalty_dice=0, root=None, vampire=False, error=None):
+        self.roll_times = roll_times
+        self.bonus_dice = bonus_dice
+        self.penalty_dice = penalty_dice
+        self.root = root
+        self.vampire = vampire
+        self.error = error
+
+
+def normalize_expression(expression: str) -> str:
+    """规范化表达式（x/X 视为乘号），作为编译缓存的键"""
+    return expression.replace("x", "*").replace("X", "*")
+
+
+def compile_expression(expression: str) -> DiceProgram:
+    """编译掷骰表达式，相同的表达式只解析一次"""
+    return _compile(normalize_expression(expression))
+
+
+def compile_cache_info():
+    return _compile.cache_info()
+
+
+def iter_dice(node):
+    """按出现顺序遍历语法树中的骰子项"""
+    if isinstance(node, DiceTerm):
+        yield node
+    elif isinstance(node, BinOp):
+        yield from iter_dice(node.left)
+        yield from iter_dice(node.right)
+
+
+def _compile_atom(expr: str):
+    """编译单个数字或骰子"""
+    if expr.isdigit():
+        return Const(int(expr))
+
+    match = _DICE_RE.match(expr)
+    if not match:
+        raise DiceExpressionError(f"⚠️ 格式错误 `{expr}`")
+
+    dice_count = int(match.group(1)) if match.group(1) else 1
+    dice_faces = int(match.group(2))
+    keep_highest = int(match.group(3)[1:]) if match.group(3) else dice_count
+    vampire_difficulty = (int(match.group(5)) if match.group(4) and match.group(4).strip() != "v" else 6) if match.group(4) else None
+
+    if not (1 <= dice_count <= MAX_DICE_COUNT and 1 <= dice_faces <= MAX_DICE_FACES):
+        raise DiceExpressionError("⚠️ 骰子个数 1-100，面数 1-1000，否则非法！")
+
+    # 难度 0 沿用旧行为，按普通骰处理
+    return DiceTerm(dice_count, dice_faces, keep_highest, vampire_difficulty or None)
+
+
+def _fold(op: str, left, right):
+    """构造二元运算节点，两侧均为常数时直接折叠"""
+    if op == "/" and isinstance(right, Const) and right.value == 0:
+        raise DiceExpressionError("⚠️ 除数不能为 0！")
+    if isinstance(left, Const) and isinstance(right, Const):
+        return Const(OPERATORS[op](left.value, right.value))
+    return BinOp(op, left, right)
+
+
+class _Parser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self):
+        tok = self.peek()
+        self.pos += 1
+        return tok
+
+    def parse(self):
+        node = self.expr()
+        if self.peek() is not None:
+            raise DiceExpressionError(f"⚠️ 格式错误 `{self.peek()}`")
+        return node
+
+    def expr(self):
+        node = self.term()
+        while self.peek() in ("+", "-"):
+            op = self.take()
+            node = _fold(op, node, self.term())
+        return node
+
+    def term(self):
+        node = self.factor()
+        while self.peek() in ("*", "/"):
+            op = self.take()
+            node = _fold(op, node, self.factor())
+        return node
+
+    def factor(self):
+        tok = self.take()
+        if tok == "(":
+            node = self.expr()
+            if self.take() != ")":
+                raise DiceExpressionError("⚠️ 括号不匹配！")
+            node.paren = True
+            return node
+        if tok is None or tok in OPERATORS or tok == ")":
+            raise DiceExpressionError(f"⚠️ 格式错误 `{'' if tok is None else tok}`")
+        return _compile_atom(tok)
+
+
+@lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def _compile(expression: str) -> DiceProgram:
+    roll_times = 1
+    bonus_dice = 0
+    penalty_dice = 0
+
+    match_repeat = _REPEAT_RE.match(expression)
+    if match_repeat:    # Matched: roll group(2) for group(1) times
+        roll_times = int(match_repeat.group(1)) if match_repeat.group(1) else 1
+        expression = match_repeat.group(2)
+
+        if expression in ["p", "b"]:
+            penalty_dice = 1 if expression == "p" else 0
+            bonus_dice = 1 if expression == "b" else 0
+            expression = "1d100"
+
+    tokens = [tok.strip() for tok in _TOKEN_RE.split(expression) if tok.strip()]
+    try:
+        root = _Parser(tokens).parse()
+    except DiceExpressionError as e:
+        return DiceProgram(error=str(e))
+
+    vampire = any(term.vampire for term in iter_dice(root))
+    return DiceProgram(roll_times, bonus_dice, penalty_dice, root, vampire)
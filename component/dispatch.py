@@ -0,0 +1,280 @@
+import re
+from typing import Callable, Optional, Tuple
+
+# 快捷指令分发（identify_command）：指令名建成前缀树，消息只需从头走一遍即可确定指令，
+# 随后只运行该指令自己的参数解析器。
+#
+# - 指令名中间的空白会被跳过（与旧实现在去空白的紧凑串上识别一致），
+#   因此 `.pc create`、`.fu mark add` 这类多段指令直接作为一个指令名注册；
+# - 取最长匹配：`.rab` 优先于 `.ra`，`.rdist` 优先于 `.rd`；
+# - 解析器收到指令名之后的原始文本（保留空格），返回传给处理方法的位置参数元组，
+#   返回 None 表示格式不符、不做处理。
+
+# 技能值 / 成长值：位于末尾的数字或骰子表达式，如 `侦查50`、`san1d10`
+_TAIL_VALUE_RE = re.compile(r"(([0-9]*[dD]*[0-9]+(?:[+-][0-9]*[dD][0-9]+)*)+)$")
+_LEADING_NUM_RE = re.compile(r"\d+")
+# 掷骰：位于开头的骰子 / 四则运算表达式（可带 N# 重复与括号），其后的文本为备注，
+# 如 `2d6+3 攻击`、`(2d6+6)*5`、`3#1d20`、`20侦查`
+_DICE_TERM = r"(?:\d*[dD]\d+(?:[kK]\d+)?(?:[vV]\d*)?|\d+)"
+_LEADING_DICE_RE = re.compile(
+    rf"\s*((?:\d+\s*#\s*)?[\s(]*{_DICE_TERM}(?:[\s)]*[+\-*/][\s(]*{_DICE_TERM})*[\s)]*)(.*)", re.S
+)
+# pc update：属性名 + 可选运算符 + 数值或骰子
+_UPDATE_RE = re.compile(r"^(.*?)([+\-*]?\d*d?\d+)$")
+_WS_RE = re.compile(r"\s+")
+
+
+class Command:
+    """
+    已注册的快捷指令。
+    - name: 指令名（不含空白，小写）
+    - handler: DicePlugin 上处理方法的名字
+    - parser: 参数解析器 parser(rest) -> tuple | None
+    """
+    __slots__ = ("name", "handler", "parser")
+
+    def __init__(self, name: str, handler: str, parser: Callable[[str], Optional[tuple]]):
+        self.name = name
+        self.handler = handler
+        self.parser = parser
+
+
+class CommandTrie:
+    def __init__(self):
+        self._root = {}
+
+    def add(self, name: str, handler: str, parser: Callable[[str], Optional[tuple]]):
+        name = name.lower()
+        node = self._root
+        for ch in name:
+            node = node.setdefault(ch, {})
+        node[None] = Command(name, handler, parser)    # None 键标记指令结束
+
+    def match(self, text: str) -> Tuple[Optional[Command], str]:
+        """
+        返回 (最长匹配的指令, 指令名之后的原始文本)；无匹配时返回 (None, text)。
+        """
+        node = self._root
+        found = None
+        end = 0
+        for i, ch in enumerate(text):
+            if ch.isspace():
+                continue
+            node = node.get(ch.lower())
+            if node is None:
+                break
+            if None in node:
+                found = node[None]
+                end = i + 1
+        if found is None:
+            return None, text
+        return found, text[end:]
+
+
+QUICK_COMMANDS = CommandTrie()
+
+
+def quick_command(*names: str, handler: str):
+    """注册快捷指令解析器：@quick_command("ra", handler="roll_attribute")"""
+    def decorator(parser):
+        for name in names:
+            QUICK_COMMANDS.add(name, handler, parser)
+        return parser
+    return decorator
+
+
+def compact(text: str) -> str:
+    """去掉所有空白"""
+    return _WS_RE.sub("", text)
+
+
+def split_tail_value(text: str):
+    """把紧凑串拆成 (名称, 末尾的数值/骰子表达式 或 None)"""
+    match = _TAIL_VALUE_RE.search(text)
+    if not match:
+        return text, None
+    return text[:match.start()], match.group(1)
+
+
+def _no_args(rest: str):
+    return ()
+
+
+# ---------- 掷骰 ----------
+def split_dice_remark(rest: str):
+    """拆出开头的掷骰表达式（去掉空白）与其后的备注，没有表达式时为 (None, 备注)；空的部分为 None"""
+    match = _LEADING_DICE_RE.match(rest)
+    if not match:
+        return None, rest.strip() or None
+    return compact(match.group(1)), match.group(2).strip() or None
+
+
+@quick_command("r", handler="handle_roll_dice")
+def parse_roll(rest: str):
+    # 表达式交给 parse_dice_expression，与 /r 一致支持 * / 与括号；没有表达式时掷默认骰
+    return split_dice_remark(rest)
+
+
+@quick_command("rd", handler="handle_roll_dice")
+def parse_roll_default(rest: str):
+    # .rd20 即 1d20，.rd20 侦查 带备注；.rd 侦查 掷默认骰
+    expr, remark = split_dice_remark(rest)
+    if expr and expr.isdigit():
+        expr = f"1d{expr}"
+    return expr, remark
+
+
+@quick_command("rdist", handler="roll_distribution")
+def parse_roll_distribution(rest: str):
+    return (compact(rest) or None,)
+
+
+@quick_command("rh", handler="roll_hidden")
+def parse_roll_hidden(rest: str):
+    # 暗骰没有备注，表达式之后的文本忽略
+    return (split_dice_remark(rest)[0],)
+
+
+# ---------- 技能检定 ----------
+@quick_command("ra", handler="roll_attribute")
+def parse_roll_attribute(rest: str):
+    skill_name, skill_value = split_tail_value(compact(rest))
+    if not skill_name and skill_value:
+        skill_name = skill_value
+    return skill_name, skill_value
+
+
+@quick_command("rad", handler="roll_attribute_random")
+def parse_roll_attribute_random(rest: str):
+    # 未给出技能值时由处理方法随机生成
+    return parse_roll_attribute(rest)
+
+
+@quick_command("rab", handler="roll_attribute_bonus")
+@quick_command("rap", handler="roll_attribute_penalty")
+def parse_roll_attribute_dice(rest: str):
+    # .rab2侦查 / .rap 侦查50：紧跟的数字为奖励/惩罚骰个数
+    text, skill_value = split_tail_value(compact(rest))
+    dice_count = "1"
+    count_match = _LEADING_NUM_RE.match(text)
+    if count_match:
+        dice_count = count_match.group()
+        text = text[count_match.end():]
+    if not text and skill_value:
+        text = skill_value
+    return dice_count, text, skill_value
+
+
+@quick_command("en", handler="pc_grow_up")
+def parse_grow_up(rest: str):
+    return split_tail_value(compact(rest))
+
+
+@quick_command("st", handler="status")
+def parse_status(rest: str):
+    attributes = compact(rest)
+    return (attributes,) if attributes else None
+
+
+# ---------- 理智 / 先攻 / 其他 ----------
+@quick_command("sc", handler="pc_san_check")
+def parse_san_check(rest: str):
+    return (compact(rest),)
+
+
+quick_command("ti", handler="pc_temporary_insanity")(_no_args)
+quick_command("li", handler="pc_long_term_insanity")(_no_args)
+quick_command("sn", handler="filter_set_nickname")(_no_args)
+quick_command("jrrp", handler="roll_RP_cmd")(_no_args)
+
+
+@quick_command("ri", handler="roll_initiative")
+def parse_roll_initiative(rest: str):
+    return (compact(rest) or None,)
+
+
+@quick_command("coc", handler="generate_coc_character")
+@quick_command("dnd", handler="generate_dnd_character")
+def parse_generate(rest: str):
+    count = compact(rest)
+    return (int(count) if count.isdigit() else 1,)
+
+
+@quick_command("name", handler="generate_name")
+def parse_generate_name(rest: str):
+    parts = rest.split()
+    language = parts[0] if len(parts) > 0 else "cn"
+    num = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 5
+    sex = parts[2] if len(parts) > 2 else None
+    return language, num, sex
+
+
+# ---------- 人物卡 ----------
+@quick_command("pccreate", handler="pc_create_character")
+def parse_pc_create(rest: str):
+    parts = rest.split(maxsplit=1)
+    name = parts[0] if parts else None
+    attributes = parts[1] if len(parts) > 1 else ""
+    return name, attributes
+
+
+@quick_command("pcshow", handler="pc_show_character")
+def parse_pc_show(rest: str):
+    return (compact(rest) or None,)
+
+
+quick_command("pclist", handler="pc_list_characters")(_no_args)
+
+
+@quick_command("pcchange", handler="pc_change_character")
+@quick_command("pcdelete", handler="pc_delete_character")
+def parse_pc_name(rest: str):
+    name = rest.strip()
+    return (name,) if name else None
+
+
+@quick_command("pcupdate", handler="pc_update_character")
+def parse_pc_update(rest: str):
+    text = compact(rest)
+    match = _UPDATE_RE.match(text)
+    if not match or not match.group(1):
+        return text, ""
+    return match.group(1), match.group(2)
+
+
+# ---------- 最终物语 FU ----------
+@quick_command("fucheck", handler="fu_check_command")
+def parse_fu_check(rest: str):
+    params = rest.split()
+    attr1 = params[0] if len(params) > 0 else ""
+    attr2 = params[1] if len(params) > 1 else ""
+    difficulty = params[2] if len(params) > 2 else "6"
+    return attr1, attr2, difficulty
+
+
+@quick_command("fumarkcreate", "fumarkadd", "fumarknew", handler="fu_create_command")
+def parse_fu_mark_create(rest: str):
+    params = rest.split()
+    name = params[0] if len(params) > 0 else ""
+    length = params[1] if len(params) > 1 else ""
+    return name, length
+
+
+@quick_command("fumarkshow", "fumarklist", handler="fu_show_command")
+def parse_fu_mark_show(rest: str):
+    params = rest.split()
+    return (params[0] if params else "",)
+
+
+@quick_command("fumarkadvance", "fumarkadv", "fumarkpush", "fumarkinc", handler="fu_advance_command")
+def parse_fu_mark_advance(rest: str):
+    params = rest.split()
+    identifier = params[0] if len(params) > 0 else ""
+    value = params[1] if len(params) > 1 else ""
+    return identifier, value
+
+
+@quick_command("fumarkdelete", "fumarkdel", "fumarkremove", "fumarkrm", handler="fu_delete_command")
+def parse_fu_mark_delete(rest: str):
+    params = rest.split()
+    return (params[0] if params else "",)
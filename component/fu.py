@@ -1,20 +1,26 @@
-import random
+import contextvars
+
 from .output import get_output
 from . import character as charmod
+from .rng import get_random
 
-# 模块级活动群，用于按群隔离命刻与人物卡访问
-_active_group = None
+# 活动群，用于按群隔离命刻与人物卡访问。
+# 与 character 模块相同用 ContextVar 保存：每条消息的处理协程各自持有自己的值，
+# 处理中途 await（如查询昵称）时其他群的消息无法改写它，run_io 派发的线程也能读到。
+_active_group = contextvars.ContextVar("fu_active_group", default=None)
 # 命刻按群组隔离存储：{ group_id_str: [Mark, ...] }
 marks_by_group = {}
 
 
 def set_active_group(group_id):
-    global _active_group
-    _active_group = group_id
+    _active_group.set(group_id)
 
 
-def _get_marks_for_group():
-    key = str(_active_group) if _active_group is not None else "_global"
+def _get_marks_for_group(group_id=None):
+    """取群的命刻列表；group_id 为 None 时使用当前活动群"""
+    if group_id is None:
+        group_id = _active_group.get()
+    key = str(group_id) if group_id is not None else "_global"
     if key not in marks_by_group:
         marks_by_group[key] = []
     return marks_by_group[key]
@@ -27,6 +33,7 @@ def fu_check(attr1: str, attr2: str, difficulty: int, user_id: str = None, name:
     - 两枚相同且 >=6 为大成功；两枚均为1为大失败；否则比较两骰之和与难度
     返回格式化字符串（使用 output 模板）。
     """
+    rng = get_random()
     try:
         difficulty = int(difficulty)
     except Exception:
@@ -57,8 +64,8 @@ def fu_check(attr1: str, attr2: str, difficulty: int, user_id: str = None, name:
     else:
         hope_attr, hope_max, fear_attr, fear_max = attr2, v2, attr1, v1
 
-    hope_roll = random.randint(1, max(1, hope_max))
-    fear_roll = random.randint(1, max(1, fear_max))
+    hope_roll = rng.randint(1, max(1, hope_max))
+    fear_roll = rng.randint(1, max(1, fear_max))
 
     hope_dice = hope_roll
     fear_dice = fear_roll
@@ -179,7 +186,7 @@ def _render_progress_bar(mark: Mark) -> str:
     return "".join(["■" for _ in range(filled)] + ["□" for _ in range(empty)])
 
 
-def create_mark(name: str, length: int) -> str:
+def create_mark(name: str, length: int, group_id=None) -> str:
     try:
         length = int(length)
     except Exception:
@@ -187,13 +194,13 @@ def create_mark(name: str, length: int) -> str:
     if length <= 0:
         return get_output("fu.mark.advance.invalid_delta", delta=length)
     m = Mark(name, length)
-    marks = _get_marks_for_group()
+    marks = _get_marks_for_group(group_id)
     marks.append(m)
     return get_output("fu.mark.create", name=m.name, bar=_render_progress_bar(m), progress=m.progress, length=m.length)
 
 
-def show_marks(identifier: str = "") -> str:
-    marks = _get_marks_for_group()
+def show_marks(identifier: str = "", group_id=None) -> str:
+    marks = _get_marks_for_group(group_id)
     if not marks:
         return get_output("fu.mark.show.empty")
     lines = []
@@ -243,12 +250,12 @@ def _find_mark(identifier, marks_list):
     return results
 
 
-def advance_mark(identifier, delta: int) -> str:
+def advance_mark(identifier, delta: int, group_id=None) -> str:
     try:
         delta = int(delta)
     except Exception:
         return get_output("fu.mark.advance.invalid_delta", delta=delta)
-    marks = _get_marks_for_group()
+    marks = _get_marks_for_group(group_id)
     matches = _find_mark(identifier, marks)
     if not matches:
         return get_output("fu.mark.advance.not_found", identifier=identifier)
@@ -264,8 +271,8 @@ def advance_mark(identifier, delta: int) -> str:
     return "\n\n".join(texts)
 
 
-def delete_mark(identifier) -> str:
-    marks = _get_marks_for_group()
+def delete_mark(identifier, group_id=None) -> str:
+    marks = _get_marks_for_group(group_id)
     if identifier == "已完成":
         before = len(marks)
         remaining = [m for m in marks if not m.is_completed()]
@@ -1,4 +1,4 @@
-import random
+from .rng import get_random
 
 class InitiativeItem:
     """
@@ -79,9 +79,10 @@ def initiative(characters):
     根据角色列表生成先攻表（随机掷骰）。
     characters: [(name, player_id, base_value), ...]
     """
+    rng = get_random()
     init_clear()
     for name, player_id, base_value in characters:
-        value = base_value + random.randint(1, 20)
+        value = base_value + rng.randint(1, 20)
         add_item(name, player_id, value)
     sort_list()
 
@@ -89,7 +90,7 @@ def roll_initiative(name, player_id, base_value):
     """
     单独为一个角色掷先攻并加入先攻表。
     """
-    value = base_value + random.randint(1, 20)
+    value = base_value + get_random().randint(1, 20)
     add_item(name, player_id, value)
     sort_list()
 
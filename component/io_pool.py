@@ -0,0 +1,74 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from .output import get_setting
+
+# 磁盘 I/O 线程池：log / character / rules 中的阻塞读写都经由这里执行，避免卡住事件循环
+IO_WORKERS = max(1, int(get_setting("io_workers", 4)))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_in_flight = 0
+_queued = 0                     # 已提交、尚未开始执行的任务数（工作线程中更新，由 _queued_lock 保护）
+_queued_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="trpgdice-io")
+    return _executor
+
+
+async def run_io(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    在 I/O 线程池中执行阻塞函数并等待结果。
+    会复制调用方的 contextvars 上下文（与 asyncio.to_thread 相同），
+    因此线程中看到的活动群组等上下文与调用协程一致。
+    """
+    global _in_flight, _queued
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    started = False
+
+    def leave_queue():
+        # 开始执行时、或未执行就被取消时离开队列，二者只计一次
+        global _queued
+        nonlocal started
+        with _queued_lock:
+            if not started:
+                started = True
+                _queued -= 1
+
+    def call():
+        leave_queue()
+        return ctx.run(func, *args, **kwargs)
+
+    with _queued_lock:
+        _queued += 1
+    _in_flight += 1
+    try:
+        return await loop.run_in_executor(get_executor(), call)
+    finally:
+        _in_flight -= 1
+        leave_queue()
+
+
+def io_stats() -> Dict[str, int]:
+    """
+    线程池指标：
+    - workers: 线程数
+    - in_flight: 已提交但尚未完成的任务数（含执行中）
+    - queued: 在队列中等待空闲线程的任务数（队列深度）
+    """
+    return {"workers": IO_WORKERS, "in_flight": _in_flight, "queued": _queued}
+
+
+def shutdown_io():
+    """等待所有已提交任务完成并关闭线程池"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
@@ -4,19 +4,115 @@ import time
 import asyncio
 import uuid
 import re
+import logging
 from typing import Dict, Any, Optional, List, Tuple
 
 PLUGIN_DIR = os.path.dirname(os.path.abspath(__file__))
-from .output import get_output
+from .output import get_output, get_setting
+from .io_pool import run_io
+
+# 存储模式：
+#   jsonl -- 每个会话一个 <会话名>.jsonl 分段文件，每条消息追加一行，index.json 只在会话状态变化时重写
+#   json  -- 旧格式，每条消息都重写整个 <会话名>.json 与 index.json
+STORAGE_JSONL = "jsonl"
+STORAGE_JSON = "json"
+
+_CQ_IMAGE_RE = re.compile(r'\[CQ:image,.*?url=.*?(?:,|])')
+
+_log = logging.getLogger(__name__)
 
 class JSONLoggerCore:
-    def __init__(self, base_dir: str = f"{PLUGIN_DIR}/../data/group_logs/"):
+    def __init__(self, base_dir: str = f"{PLUGIN_DIR}/../data/group_logs/", storage: str = STORAGE_JSONL):
         self.base_dir = base_dir
+        self.storage = storage
         self.sessions: Dict[str, Dict[str, Any]] = {}
         self.locks: Dict[str, asyncio.Lock] = {}
 
+        # 后台写入：待落盘消息 { group_id: { session_name: [msg, ...] } }
+        self.flush_interval = float(get_setting("log_flush_interval", 2))
+        self.flush_messages = int(get_setting("log_flush_messages", 50))
+        self._pending: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+        self._dirty: set = set()
+        self._pending_count = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._writer: Optional[asyncio.Task] = None
+        # submit_message：群尚未载入时，载入完成前到达的消息按顺序暂存于此
+        self._loading: Dict[str, List[tuple]] = {}
+        self._load_tasks: set = set()
+
     async def initialize(self):
-        os.makedirs(self.base_dir, exist_ok=True)
+        await run_io(os.makedirs, self.base_dir, exist_ok=True)
+        self._ensure_writer()
+
+    def _ensure_writer(self):
+        if self._writer is None or self._writer.done():
+            self._wakeup = asyncio.Event()
+            self._writer = asyncio.get_running_loop().create_task(self._writer_loop())
+
+    async def _writer_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush_all()
+            except Exception:
+                # 写入任务不能因一次异常退出，否则之后的消息都不会再落盘
+                _log.exception("group log writer failed")
+
+    def _requeue(self, group_id: str, pending: Dict[str, List[Dict[str, Any]]]):
+        """写入失败时把未落盘的消息放回缓冲（排在之后到达的消息前面），并重新标记为待写"""
+        queue = self._pending.setdefault(group_id, {})
+        for name, msgs in pending.items():
+            queue[name] = msgs + queue.get(name, [])
+            self._pending_count += len(msgs)
+        self._dirty.add(group_id)
+
+    async def flush(self, group_id: str):
+        """把某个群的待写消息落盘；失败时消息放回缓冲，下次写入时重试"""
+        if group_id not in self._dirty:
+            return
+        self._dirty.discard(group_id)
+        pending = self._pending.pop(group_id, {})
+        self._pending_count -= sum(len(msgs) for msgs in pending.values())
+        try:
+            if self.storage != STORAGE_JSONL:
+                await self.persist_group(group_id)
+                pending = {}
+                return
+            grp = self.sessions.get(group_id, {})
+            async with self._get_lock(group_id):
+                for name in list(pending):
+                    msgs = pending[name]
+                    if msgs and name in grp:
+                        await run_io(self._append_segment, self._get_segment_path(group_id, name), msgs)
+                    del pending[name]
+        finally:
+            # 出错或被取消时 pending 中剩下的是尚未写入的消息
+            if pending:
+                self._requeue(group_id, pending)
+
+    async def flush_all(self):
+        for group_id in list(self._dirty):
+            try:
+                await self.flush(group_id)
+            except Exception:
+                _log.exception("flushing log of group %s failed, will retry", group_id)
+
+    async def close(self):
+        """停止后台写入任务，并把剩余消息全部落盘（插件卸载时调用）"""
+        if self._load_tasks:
+            await asyncio.gather(*self._load_tasks, return_exceptions=True)
+        if self._writer is not None:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._writer = None
+        await self.flush_all()
 
     def _get_group_dir(self, group_id: str) -> str:
         return os.path.join(self.base_dir, str(group_id))
@@ -27,14 +123,37 @@ class JSONLoggerCore:
     def _get_session_path(self, group_id: str, session_name: str) -> str:
         return os.path.join(self._get_group_dir(group_id), f"{session_name}.json")
 
+    def _get_segment_path(self, group_id: str, session_name: str) -> str:
+        return os.path.join(self._get_group_dir(group_id), f"{session_name}.jsonl")
+
     def _get_lock(self, group_id: str) -> asyncio.Lock:
         return self.locks.setdefault(group_id, asyncio.Lock())
 
     async def load_group(self, group_id: str) -> Dict[str, Any]:
-        if group_id in self.sessions:
-            return self.sessions[group_id]
+        grp = self.sessions.get(group_id)
+        if grp is not None:
+            return grp
+        # 同一群的首次载入串行执行：旧格式会话的转换只做一次，后到的协程直接使用已载入的结果
+        async with self._get_lock(group_id):
+            grp = self.sessions.get(group_id)
+            if grp is None:
+                grp = self.sessions[group_id] = await run_io(self._load_group_sync, group_id)
+        return grp
+
+    @staticmethod
+    def _newer(path_a: str, path_b: str) -> Optional[str]:
+        """两个文件中较新的一个（只存在一个时即为它，都不存在时为 None）"""
+        try:
+            mtime_a = os.stat(path_a).st_mtime_ns
+        except OSError:
+            mtime_a = None
+        try:
+            mtime_b = os.stat(path_b).st_mtime_ns
+        except OSError:
+            return path_a if mtime_a is not None else None
+        return path_a if mtime_a is not None and mtime_a >= mtime_b else path_b
 
-        grp_dir = self._get_group_dir(group_id)
+    def _load_group_sync(self, group_id: str) -> Dict[str, Any]:
         idx_path = self._get_index_path(group_id)
         grp: Dict[str, Any] = {}
 
@@ -48,8 +167,19 @@ class JSONLoggerCore:
             index = {}
 
         for name, meta in index.items():
+            seg_path = self._get_segment_path(group_id, name)
             sess_path = self._get_session_path(group_id, name)
-            if os.path.isfile(sess_path):
+            # 切换过存储模式时两种文件可能同时存在，以较新的为准（同样新时优先当前模式的文件）
+            if self.storage == STORAGE_JSONL:
+                path = self._newer(seg_path, sess_path)
+            else:
+                path = self._newer(sess_path, seg_path)
+            if path == seg_path:
+                grp[name] = {"start_time": meta.get("start_time", 0),
+                             "end_time": meta.get("end_time", None),
+                             "messages": self._read_segment(seg_path),
+                             "finished": meta.get("finished", False)}
+            elif path == sess_path:
                 try:
                     with open(sess_path, "r", encoding="utf-8") as f:
                         data = json.load(f)
@@ -59,49 +189,149 @@ class JSONLoggerCore:
                     data.setdefault("finished", meta.get("finished", False))
                     grp[name] = data
                 except Exception:
-                    pass
+                    continue
+                if self.storage == STORAGE_JSONL:
+                    # 旧格式会话一次性转换为分段文件，之后只做追加
+                    self._write_segment(seg_path, data["messages"])
+                    if os.path.isfile(seg_path):
+                        try:
+                            os.remove(sess_path)
+                        except Exception:
+                            pass
 
-        self.sessions[group_id] = grp
         return grp
 
+    @staticmethod
+    def _read_segment(seg_path: str) -> List[Dict[str, Any]]:
+        messages = []
+        with open(seg_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    messages.append(json.loads(line))
+                except Exception:
+                    # 进程中断时最后一行可能写了一半，跳过即可
+                    pass
+        return messages
+
+    @staticmethod
+    def _write_segment(seg_path: str, messages: List[Dict[str, Any]]):
+        os.makedirs(os.path.dirname(seg_path), exist_ok=True)
+        tmp = seg_path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                for m in messages:
+                    f.write(json.dumps(m, ensure_ascii=False) + "\n")
+            os.replace(tmp, seg_path)
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    @staticmethod
+    def _append_segment(seg_path: str, messages: List[Dict[str, Any]]):
+        os.makedirs(os.path.dirname(seg_path), exist_ok=True)
+        with open(seg_path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(m, ensure_ascii=False) + "\n" for m in messages))
+
     async def persist_group(self, group_id: str):
         lock = self._get_lock(group_id)
         async with lock:
             grp = self.sessions.get(group_id, {})
-            grp_dir = self._get_group_dir(group_id)
-            os.makedirs(grp_dir, exist_ok=True)
-
-            for name, sec in list(grp.items()):
-                session_path = self._get_session_path(group_id, name)
-                tmp = session_path + ".tmp"
-                try:
-                    with open(tmp, "w", encoding="utf-8") as f:
-                        json.dump(sec, f, ensure_ascii=False, indent=2)
-                    os.replace(tmp, session_path)
-                except Exception:
-                    if os.path.exists(tmp):
-                        os.remove(tmp)
-
-            # index.json
-            index = {name: {"start_time": sec.get("start_time", 0),
-                            "end_time": sec.get("end_time", None),
-                            "finished": bool(sec.get("finished", False))}
-                     for name, sec in grp.items()}
-            idx_path = self._get_index_path(group_id)
-            idx_tmp = idx_path + ".tmp"
+            # 在事件循环线程上做浅拷贝，线程池中序列化时不会与新消息的写入冲突
+            snapshot = {name: dict(sec, messages=list(sec.get("messages", []))) for name, sec in grp.items()}
+            await run_io(self._persist_group_sync, group_id, snapshot, self._build_index(grp))
+
+    def _persist_group_sync(self, group_id: str, snapshot: Dict[str, Any], index: Dict[str, Any]):
+        os.makedirs(self._get_group_dir(group_id), exist_ok=True)
+
+        for name, sec in snapshot.items():
+            if self.storage == STORAGE_JSONL:
+                self._write_segment(self._get_segment_path(group_id, name), sec.get("messages", []))
+                continue
+            session_path = self._get_session_path(group_id, name)
+            tmp = session_path + ".tmp"
             try:
-                with open(idx_tmp, "w", encoding="utf-8") as f:
-                    json.dump(index, f, ensure_ascii=False, indent=2)
-                os.replace(idx_tmp, idx_path)
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(sec, f, ensure_ascii=False, indent=2)
+                os.replace(tmp, session_path)
             except Exception:
-                if os.path.exists(idx_tmp):
-                    os.remove(idx_tmp)
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+
+        self._write_index(group_id, index)
+
+    async def persist_index(self, group_id: str):
+        """只重写 index.json（jsonl 模式下会话状态变化时使用）"""
+        lock = self._get_lock(group_id)
+        async with lock:
+            index = self._build_index(self.sessions.get(group_id, {}))
+            await run_io(self._write_index, group_id, index)
+
+    async def persist_state(self, group_id: str):
+        """会话状态变化后的落盘：jsonl 模式只写索引，json 模式整组重写"""
+        if self.storage == STORAGE_JSONL:
+            await self.persist_index(group_id)
+        else:
+            await self.persist_group(group_id)
+
+    @staticmethod
+    def _build_index(grp: Dict[str, Any]) -> Dict[str, Any]:
+        return {name: {"start_time": sec.get("start_time", 0),
+                       "end_time": sec.get("end_time", None),
+                       "finished": bool(sec.get("finished", False))}
+                for name, sec in grp.items()}
+
+    def _write_index(self, group_id: str, index: Dict[str, Any]):
+        os.makedirs(self._get_group_dir(group_id), exist_ok=True)
+        idx_path = self._get_index_path(group_id)
+        idx_tmp = idx_path + ".tmp"
+        try:
+            with open(idx_tmp, "w", encoding="utf-8") as f:
+                json.dump(index, f, ensure_ascii=False, indent=2)
+            os.replace(idx_tmp, idx_path)
+        except Exception:
+            if os.path.exists(idx_tmp):
+                os.remove(idx_tmp)
 
     # ===== 功能性函数 =====
 
     async def add_message(self, group_id: str, user_id: str, nickname: str, timestamp: int,
                       text: str, components: Optional[List[Any]] = None, isDice: bool = False) -> Tuple[bool,str]:
         grp = await self.load_group(group_id)
+        return self._append_message(grp, group_id, user_id, nickname, timestamp, text, components, isDice)
+
+    def submit_message(self, group_id: str, user_id: str, nickname: str, timestamp: int,
+                       text: str, components: Optional[List[Any]] = None, isDice: bool = False):
+        """
+        不等待的 add_message：供消息监听路径使用。
+        群已载入时直接写入缓冲；否则启动一次后台载入，载入完成后按到达顺序补记。
+        """
+        grp = self.sessions.get(group_id)
+        if grp is not None:
+            self._append_message(grp, group_id, user_id, nickname, timestamp, text, components, isDice)
+            return
+
+        args = (user_id, nickname, timestamp, text, components, isDice)
+        waiting = self._loading.get(group_id)
+        if waiting is None:
+            waiting = self._loading[group_id] = []
+            task = asyncio.get_running_loop().create_task(self._load_and_drain(group_id))
+            self._load_tasks.add(task)
+            task.add_done_callback(self._load_tasks.discard)
+        waiting.append(args)
+
+    async def _load_and_drain(self, group_id: str):
+        try:
+            grp = await self.load_group(group_id)
+        finally:
+            waiting = self._loading.pop(group_id, [])
+        for args in waiting:
+            self._append_message(grp, group_id, *args)
+
+    def _append_message(self, grp: Dict[str, Any], group_id: str, user_id: str, nickname: str, timestamp: int,
+                        text: str, components: Optional[List[Any]], isDice: bool) -> Tuple[bool,str]:
         active_names = [n for n, s in grp.items() if (s.get("end_time") is None and not s.get("finished", False))]
         if not active_names:
             return False, get_output("log.no_active_session")
@@ -119,18 +349,25 @@ class JSONLoggerCore:
                     images.append(comp.file)
 
         # 清理文本
-        text_clean = re.sub(r'\[CQ:image,.*?url=.*?(?:,|])', '', text).strip()
+        text_clean = _CQ_IMAGE_RE.sub('', text).strip()
 
-        sec.setdefault("messages", []).append({
+        msg = {
             "timestamp": timestamp,
             "user_id": user_id,
             "nickname": nickname,
             "text": text_clean,
             "images": images,
             "isDice": isDice
-        })
-
-        await self.persist_group(group_id)
+        }
+        sec.setdefault("messages", []).append(msg)
+
+        # 交给后台任务批量落盘，消息路径上不再做磁盘写入
+        self._pending.setdefault(group_id, {}).setdefault(latest_name, []).append(msg)
+        self._dirty.add(group_id)
+        self._pending_count += 1
+        self._ensure_writer()
+        if self._pending_count >= self.flush_messages:
+            self._wakeup.set()
         return True, get_output("log.message_added")
 
     async def new_session(self, group_id: str, name: Optional[str] = None) -> Tuple[bool,str]:
@@ -140,7 +377,9 @@ class JSONLoggerCore:
             return False, get_output("log.unfinished_session", session_name=unfinished[-1])
         name = name or uuid.uuid4().hex[:8]
         grp[name] = {"start_time": int(time.time()), "end_time": None, "messages": [], "finished": False}
-        await self.persist_group(group_id)
+        if self.storage == STORAGE_JSONL:
+            await run_io(self._write_segment, self._get_segment_path(group_id, name), [])
+        await self.persist_state(group_id)
         return True, get_output("log.new_session", session_name=name)
 
     async def resume_session(self, group_id: str, name: Optional[str] = None) -> Tuple[bool,str]:
@@ -151,7 +390,7 @@ class JSONLoggerCore:
             if sec.get("finished"): return False, get_output("log.session_finished", session_name=name)
             if sec.get("end_time") is None: return False, get_output("log.session_active", session_name=name)
             sec["end_time"] = None
-            await self.persist_group(group_id)
+            await self.persist_state(group_id)
             return True, get_output("log.session_resumed", session_name=name)
 
         # 自动恢复最后一个暂停会话
@@ -160,21 +399,24 @@ class JSONLoggerCore:
             return False, get_output("log.no_paused_session")
         sec = grp[paused[-1]]
         sec["end_time"] = None
-        await self.persist_group(group_id)
+        await self.persist_state(group_id)
         return True, get_output("log.session_resumed", session_name=paused[-1])
 
     async def pause_sessions(self, group_id: str) -> Tuple[bool,str]:
         grp = await self.load_group(group_id)
+        # 先把本群缓冲中的消息落盘，再改写并保存会话状态
+        await self.flush(group_id)
         active = [n for n, s in grp.items() if s.get("end_time") is None and not s.get("finished", False)]
         if not active:
             return False, get_output("log.no_active_session")
         sec = grp[active[-1]]
         sec["end_time"] = int(time.time())
-        await self.persist_group(group_id)
+        await self.persist_state(group_id)
         return True, get_output("log.session_paused", session_name=active[-1])
 
     async def end_session(self, group_id: str) -> Tuple[bool,str]:
         grp = await self.load_group(group_id)
+        await self.flush(group_id)
         active = [n for n, s in grp.items() if s.get("end_time") is None and not s.get("finished", False)]
         if not active:
             return False, get_output("log.no_active_session")
@@ -182,7 +424,7 @@ class JSONLoggerCore:
         sec = grp[name]
         sec["end_time"] = int(time.time())
         sec["finished"] = True
-        await self.persist_group(group_id)
+        await self.persist_state(group_id)
         return True, await self.export_session(group_id, sec, name)
 
     async def halt_session(self, group_id: str) -> Tuple[bool,str]:
@@ -192,7 +434,9 @@ class JSONLoggerCore:
             return False, get_output("log.no_unfinished_session")
         name = unfinished[-1]
         del grp[name]
-        await self.persist_group(group_id)
+        if self.storage == STORAGE_JSONL:
+            await run_io(self._remove_files, [self._get_segment_path(group_id, name)])
+        await self.persist_state(group_id)
         return True, get_output("log.session_halted", session_name=name)
 
     async def list_sessions(self, group_id: str) -> List[str]:
@@ -208,16 +452,11 @@ class JSONLoggerCore:
         grp = await self.load_group(group_id)
         if name not in grp:
             return False, get_output("log.session_not_found", session_name=name)
-        try:
-            os.remove(self._get_session_path(group_id, name))
-        except Exception:
-            pass
-        try:
-            os.remove(os.path.join(self.base_dir, "exports", f"{group_id}_{name}.json"))
-        except Exception:
-            pass
+        await run_io(self._remove_files, [self._get_session_path(group_id, name),
+                                          self._get_segment_path(group_id, name),
+                                          os.path.join(self.base_dir, "exports", f"{group_id}_{name}.json")])
         del grp[name]
-        await self.persist_group(group_id)
+        await self.persist_state(group_id)
         return True, get_output("log.session_deleted", session_name=name)
 
     async def export_session(self, group_id: str, sec: dict, name: str) -> str:
@@ -235,12 +474,24 @@ class JSONLoggerCore:
             })
 
         exports_dir = os.path.join(self.base_dir, "exports")
-        os.makedirs(exports_dir, exist_ok=True)
         file_name = f"{group_id}_{name}.json"
         file_path = os.path.join(exports_dir, file_name)
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(export_data, f, ensure_ascii=False, indent=2)
+        await run_io(self._write_export, file_path, export_data)
             
         website = get_output("setting.website")
         result_website = f"{website}/?file={file_name}" 
         return get_output("log.session_exported", file_name=file_name, result_website = result_website)
+
+    @staticmethod
+    def _write_export(file_path: str, export_data: Dict[str, Any]):
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(export_data, f, ensure_ascii=False, indent=2)
+
+    @staticmethod
+    def _remove_files(paths: List[str]):
+        for path in paths:
+            try:
+                os.remove(path)
+            except Exception:
+                pass
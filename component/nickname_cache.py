@@ -0,0 +1,122 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict
+
+from .output import get_setting
+
+# 群昵称缓存：get_sender_nickname 每次掷骰都要请求 get_group_member_info，
+# 这里按 (群, 用户) 做 TTL + LRU 缓存；同一用户并发的多次查询共用一次请求。
+# 收到群名片变更通知、或本插件自己调用 set_group_card 后，对应条目立即失效/更新。
+
+NICKNAME_TTL = float(get_setting("nickname_cache_ttl", 300))
+NICKNAME_CACHE_SIZE = max(1, int(get_setting("nickname_cache_size", 1024)))
+
+
+class NicknameCache:
+    def __init__(self, ttl: float = NICKNAME_TTL, maxsize: int = NICKNAME_CACHE_SIZE):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()   # { (group, user): (过期时间, 昵称) }
+        self._inflight = {}             # { (group, user): asyncio.Future }
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def _key(group_id, user_id):
+        return str(group_id), str(user_id)
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, name = entry
+        if expires < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return name
+
+    def put(self, group_id, user_id, name: str):
+        key = self._key(group_id, user_id)
+        self._entries[key] = (time.monotonic() + self.ttl, name)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, group_id, user_id=None):
+        """使某个用户（或整个群）的缓存失效"""
+        if user_id is not None:
+            self._entries.pop(self._key(group_id, user_id), None)
+            return
+        group_id = str(group_id)
+        for key in [k for k in self._entries if k[0] == group_id]:
+            del self._entries[key]
+
+    async def get(self, group_id, user_id, loader: Callable[[], Awaitable[str]]) -> str:
+        """
+        取缓存的昵称；未命中时调用 loader() 查询。
+        同一 (群, 用户) 已有进行中的查询时直接等待它的结果。
+        查询结果为空（失败或无名片）时不缓存，由调用方回退到发送者名字。
+        发起查询的那条消息被取消时，只有它自己收到 CancelledError，其他等待者得到空昵称。
+        """
+        key = self._key(group_id, user_id)
+        name = self._lookup(key)
+        if name is not None:
+            self.hits += 1
+            return name
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            name = await loader()
+            if name:
+                self.put(group_id, user_id, name)
+            future.set_result(name)
+            return name
+        except asyncio.CancelledError:
+            future.set_result("")
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # 没有其他等待者时避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def handle_notice(self, raw) -> bool:
+        """
+        处理 OneBot 群名片变更通知（notice_type == "group_card"），
+        有新名片时直接写入缓存，否则使条目失效。返回是否为该类通知。
+        """
+        if not isinstance(raw, dict) or raw.get("post_type") != "notice" or raw.get("notice_type") != "group_card":
+            return False
+        group_id, user_id = raw.get("group_id"), raw.get("user_id")
+        if group_id is None or user_id is None:
+            return True
+        card = raw.get("card_new")
+        if card:
+            self.put(group_id, user_id, card)
+        else:
+            self.invalidate(group_id, user_id)
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
+
+
+nickname_cache = NicknameCache()
@@ -1,44 +1,239 @@
 import yaml
 import os
 import random
+import string
+import threading
 
 CONFIG_PATH = os.path.join(os.path.dirname(__file__), "default_config.yaml")
 
+def _config_mtime():
+    try:
+        return os.stat(CONFIG_PATH).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
 def load_config():
     if not os.path.exists(CONFIG_PATH):
         return {}
     with open(CONFIG_PATH, "r", encoding="utf-8") as f:
         return yaml.safe_load(f)
 
+_loaded_mtime = _config_mtime()
 _config = load_config()
 
+# 输出模板索引：载入配置时把 output 下的嵌套结构展平为 { "a.b.c": (Template, ...) }，
+# 每个模板预先拆成 文本/字段 片段。get_output 只做一次字典查找，渲染时按片段拼接，
+# 不再逐级遍历配置、也不再每次解析模板字符串。
+_formatter = string.Formatter()
+
+
+class Template:
+    """
+    预解析的输出模板。
+    - text: 原始模板字符串（格式化失败时原样返回，与 str.format 出错时的旧行为一致）
+    - segments: ((文本, 字段名, 格式说明, 转换符), ...)；字段名为 None 表示只有文本
+      含 a.b / a[0] 这类复杂字段或嵌套格式说明的模板为 None，渲染时退回 str.format
+    """
+    __slots__ = ("text", "segments", "static", "error")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.static = None
+        self.error = None
+        try:
+            parsed = list(_formatter.parse(text))
+        except ValueError as e:
+            # 花括号不成对：str.format 必然失败，直接返回原文
+            self.segments = ()
+            self.static = text
+            self.error = str(e)
+            return
+        segments = []
+        for literal, field, spec, conversion in parsed:
+            if field is not None and (not field.isidentifier() or "{" in (spec or "")):
+                self.segments = None
+                return
+            segments.append((literal, field, spec or "", conversion))
+        self.segments = tuple(segments)
+        if all(field is None for _, field, _, _ in segments):
+            self.static = "".join(literal for literal, _, _, _ in segments)
+
+    def render(self, kwargs: dict) -> str:
+        if self.static is not None:
+            return self.static
+        if self.segments is None:
+            try:
+                return self.text.format(**kwargs)
+            except Exception:
+                return self.text
+        parts = []
+        try:
+            for literal, field, spec, conversion in self.segments:
+                parts.append(literal)
+                if field is None:
+                    continue
+                value = kwargs[field]
+                if conversion == "r":
+                    value = repr(value)
+                elif conversion == "s":
+                    value = str(value)
+                elif conversion == "a":
+                    value = ascii(value)
+                parts.append(format(value, spec))
+        except Exception:
+            return self.text
+        return "".join(parts)
+
+
+def compile_templates(config: dict):
+    """
+    把配置中 output 下的全部模板展平并预解析。
+    返回 (index, errors)：index 为 { 点分 key: (Template, ...) }，
+    errors 为 { 点分 key: 错误说明 }（空列表、非字符串等无法作为模板的项，仅在 get_output 取用时报错）。
+    """
+    index = {}
+    errors = {}
+
+    def walk(node, prefix):
+        for k, v in node.items():
+            key = f"{prefix}.{k}" if prefix else str(k)
+            if isinstance(v, dict):
+                # 取用中间层级的 key 是配置错误；空 dict 视为未配置
+                if v:
+                    errors[key] = f"{key} has unsupported type in config.yaml: {type(v)}"
+                    walk(v, key)
+            elif isinstance(v, list):
+                if not v:
+                    errors[key] = f"{key} has an empty list in config.yaml"
+                elif not all(isinstance(t, str) for t in v):
+                    errors[key] = f"{key} has unsupported type in config.yaml: {type(v)}"
+                else:
+                    index[key] = tuple(Template(t) for t in v)
+            elif isinstance(v, str):
+                index[key] = (Template(v),)
+            else:
+                errors[key] = f"{key} has unsupported type in config.yaml: {type(v)}"
+
+    output = (config or {}).get("output", {})
+    if isinstance(output, dict):
+        walk(output, "")
+    return index, errors
+
+
+def _placeholders(template: Template) -> set:
+    if template.segments is None:
+        return {field for _, field, _, _ in _formatter.parse(template.text) if field is not None}
+    return {field for _, field, _, _ in template.segments if field is not None}
+
+
+def validate_templates(new_index: dict, old_index: dict) -> list:
+    """
+    校验新模板能否替换旧模板，返回问题列表（为空表示通过）：
+    - 旧配置中存在的 key 不能缺失（调用方会直接取用）
+    - 花括号必须成对
+    - 占位符只能使用该 key 原有模板中出现过的（即调用方会传入的参数）
+    """
+    problems = []
+    for key, old_templates in old_index.items():
+        if key not in new_index:
+            problems.append(f"{key}: missing")
+            continue
+        allowed = set().union(*(_placeholders(t) for t in old_templates))
+        for template in new_index[key]:
+            if template.error:
+                problems.append(f"{key}: {template.error}")
+                continue
+            unknown = _placeholders(template) - allowed
+            if unknown:
+                problems.append(f"{key}: unknown placeholder {', '.join(sorted(unknown))}")
+    return problems
+
+
+# (模板索引, 错误说明) 作为一个整体替换，热重载时渲染中的调用只会看到完整的旧版或新版
+_compiled = compile_templates(_config)
+_reload_lock = threading.Lock()
+
+
+def config_changed() -> bool:
+    """配置文件的修改时间是否与已载入的不同（只做一次 stat，可在事件循环中直接调用）"""
+    return _config_mtime() != _loaded_mtime
+
+
+def reload_config(force: bool = False):
+    """
+    配置文件有变化时重新读取、编译并校验，通过后整体替换；应在工作线程中调用。
+    返回 (是否已替换, 问题列表)。校验失败时保留当前配置。
+    注意：各模块在导入时读取的 setting（缓存大小等）不会随之改变，重载只影响模板与之后的 get_setting 调用。
+    """
+    global _config, _compiled, _loaded_mtime
+    with _reload_lock:
+        mtime = _config_mtime()
+        if not force and mtime == _loaded_mtime:
+            return False, []
+        try:
+            config = load_config() or {}
+        except (OSError, yaml.YAMLError) as e:
+            _loaded_mtime = mtime    # 同一份错误文件不重复报告
+            return False, [f"parse error: {e}"]
+        compiled = compile_templates(config)
+        problems = validate_templates(compiled[0], _compiled[0])
+        _loaded_mtime = mtime
+        if problems:
+            return False, problems
+        _config, _compiled = config, compiled
+        return True, []
+
+
+def get_setting(key: str, default=None):
+    """
+    读取 default_config.yaml 中 output.setting 下的配置项（原样返回，不做格式化）。
+    未配置时返回 default。
+    """
+    value = _config.get("output", {}).get("setting", {})
+    for k in key.split("."):
+        if not isinstance(value, dict) or k not in value:
+            return default
+        value = value[k]
+    return value
+
 def get_output(key: str, **kwargs):
     """
     支持多层 key，通过点分隔，如 "skill_check.normal"
     根据 key 获取输出模板，并用 kwargs 格式化。
-    如果 key 不存在则返回空字符串。
+    如果 key 不存在则抛出 ValueError。
     """
-    keys = key.split(".")
-    template = _config.get("output", {})
-    for k in keys:
-        template = template.get(k, {})
-
-    # 如果配置中未找到对应 key，template 可能是空 dict
-    if isinstance(template, dict) and not template:
-        raise ValueError(f"{key} cannot be found in config.yaml")
+    index, errors = _compiled
+    templates = index.get(key)
+    if templates is None:
+        raise ValueError(errors.get(key, f"{key} cannot be found in config.yaml"))
 
     # 支持字符串或字符串列表。如果是列表，从中随机选择一项（均等概率）
-    chosen = None
-    if isinstance(template, list):
-        if not template:
-            raise ValueError(f"{key} has an empty list in config.yaml")
-        chosen = random.choice(template)
-    elif isinstance(template, str):
-        chosen = template
-    else:
-        raise ValueError(f"{key} has unsupported type in config.yaml: {type(template)}")
+    template = templates[0] if len(templates) == 1 else random.choice(templates)
+    return template.render(kwargs)
 
-    try:
-        return chosen.format(**kwargs)
-    except Exception:
-        return chosen
+
+def benchmark(number: int = 100000):
+    """
+    测量 get_output 的单次调用耗时（微秒），用于对比模板渲染的开销：
+        python -m component.output
+    """
+    import timeit
+
+    cases = {
+        "static": ("pc.show.no_active", {}),
+        "fields": ("pc.update.success", {"attr": "san", "old": 60, "new": 55}),
+        "random_choice": ("skill_check.normal", {"name": "调查员", "skill_name": "侦查", "skill_value": 50,
+                                                 "roll_result": 42, "result": "成功"}),
+    }
+    results = {}
+    for label, (key, kwargs) in cases.items():
+        if key not in _compiled[0]:
+            continue
+        seconds = timeit.timeit(lambda: get_output(key, **kwargs), number=number)
+        results[label] = seconds / number * 1e6
+    return results
+
+
+if __name__ == "__main__":
+    for label, usec in benchmark().items():
+        print(f"{label:>14}: {usec:.3f} us/call")
@@ -0,0 +1,399 @@
+import math
+from functools import lru_cache
+
+from .output import get_output
+from .dice_expr import compile_expression, normalize_expression, Const, DiceTerm, OPERATORS
+from .rules import classify_roll, get_great_sf_rule, ROLL_TIERS, GREAT_SF_RULE_STR
+from .rng import get_numpy
+
+# 掷骰表达式的精确概率分布（.r dist）与 COC 检定各等级概率（.ra odds）。
+# - 普通骰的和：多项式卷积，骰池较大时用 FFT 求幂
+# - kN 保留最高：按面值从高到低的顺序统计量 DP
+# - 吸血鬼骰：按每颗骰子“成功 / 1 / 其他”三类结果计数
+# - COC 奖励/惩罚骰：十位取 min/max 的闭式分布
+# 结果按规范化后的表达式缓存（与编译缓存同键），重复查询直接返回。
+
+DIST_CACHE_SIZE = 256
+ODDS_CACHE_SIZE = 1024
+
+# 分布的取值范围上限（稠密数组长度）
+MAX_SUPPORT = 1_000_000
+# 纯 Python 卷积 / 乘除枚举的运算量上限
+PY_WORK_LIMIT = 5_000_000
+# 保留最高 DP 的运算量估计上限
+KEEP_WORK_LIMIT = 20_000_000
+# 结果长度达到该值时改用 NumPy（卷积 / FFT）；更小的分布用纯 Python 计算，不导入 NumPy
+FFT_MIN_SIZE = 256
+
+# 结果种类不超过该值时列出完整分布表，否则只给出分位数
+TABLE_MAX_ROWS = 20
+QUANTILES = [(0.05, "5%"), (0.25, "25%"), (0.5, "中位数"), (0.75, "75%"), (0.95, "95%")]
+
+TIER_NAMES = {
+    "great_success": "大成功",
+    "extreme_success": "极难",
+    "hard_success": "困难",
+    "success": "普通",
+    "failure": "失败",
+    "great_failure": "大失败",
+}
+
+
+class DistributionError(ValueError):
+    """分布无法计算，str(e) 为给用户看的错误文本"""
+
+
+class Distribution:
+    """
+    整数取值的离散分布。
+    probs[i] 为取值 offset + i 的概率。
+    """
+    __slots__ = ("offset", "probs")
+
+    def __init__(self, offset: int, probs):
+        self.offset = offset
+        self.probs = list(probs)
+
+    @property
+    def low(self) -> int:
+        return self.offset
+
+    @property
+    def high(self) -> int:
+        return self.offset + len(self.probs) - 1
+
+    def items(self):
+        """按取值从小到大遍历 (取值, 概率)，跳过概率为 0 的取值"""
+        for i, p in enumerate(self.probs):
+            if p > 0:
+                yield self.offset + i, p
+
+    def mean(self) -> float:
+        return sum(v * p for v, p in self.items())
+
+    def stdev(self) -> float:
+        mean = self.mean()
+        return math.sqrt(max(0.0, sum((v - mean) ** 2 * p for v, p in self.items())))
+
+    def quantile(self, q: float) -> int:
+        """累积概率首次达到 q 的取值"""
+        acc = 0.0
+        value = self.offset
+        for value, p in self.items():
+            acc += p
+            if acc >= q - 1e-12:
+                return value
+        return value
+
+    def negate(self) -> "Distribution":
+        return Distribution(-self.high, reversed(self.probs))
+
+
+class VampireOdds:
+    """
+    吸血鬼骰的结果分布。
+    - successes: { 成功数(>0): 概率 }
+    - failure / botch: 失败与大失败的概率
+    """
+    __slots__ = ("successes", "failure", "botch")
+
+    def __init__(self, successes: dict, failure: float, botch: float):
+        self.successes = successes
+        self.failure = failure
+        self.botch = botch
+
+
+def _from_dict(weights: dict) -> Distribution:
+    low, high = min(weights), max(weights)
+    if high - low + 1 > MAX_SUPPORT:
+        raise DistributionError("⚠️ 结果范围过大，无法计算分布！")
+    probs = [0.0] * (high - low + 1)
+    for v, p in weights.items():
+        probs[v - low] += p
+    return Distribution(low, probs)
+
+
+def _check_work(work: int, limit: int = PY_WORK_LIMIT):
+    if work > limit:
+        raise DistributionError("⚠️ 表达式过于复杂，无法计算精确分布！")
+
+
+def _convolve(a: Distribution, b: Distribution) -> Distribution:
+    """两个独立分布之和"""
+    size = len(a.probs) + len(b.probs) - 1
+    if size > MAX_SUPPORT:
+        raise DistributionError("⚠️ 结果范围过大，无法计算分布！")
+    offset = a.offset + b.offset
+
+    np = get_numpy() if size >= FFT_MIN_SIZE else None
+    if np is not None:
+        if min(len(a.probs), len(b.probs)) > 1:
+            out = np.fft.irfft(np.fft.rfft(a.probs, size) * np.fft.rfft(b.probs, size), size)
+            return Distribution(offset, np.clip(out, 0.0, None).tolist())
+        return Distribution(offset, np.convolve(a.probs, b.probs).tolist())
+
+    _check_work(len(a.probs) * len(b.probs))
+    out = [0.0] * size
+    for i, pa in enumerate(a.probs):
+        if pa:
+            for j, pb in enumerate(b.probs):
+                out[i + j] += pa * pb
+    return Distribution(offset, out)
+
+
+def _uniform_sum(count: int, faces: int) -> Distribution:
+    """count 个 faces 面骰之和"""
+    size = count * (faces - 1) + 1
+
+    np = get_numpy() if count > 1 and size >= FFT_MIN_SIZE else None
+    if np is not None:
+        # 单颗骰子的生成多项式做 count 次幂；长度恰好容纳结果，不会发生循环混叠
+        single = np.zeros(size)
+        single[:faces] = 1.0 / faces
+        out = np.fft.irfft(np.fft.rfft(single) ** count, size)
+        out = np.clip(out, 0.0, None)
+        return Distribution(count, (out / out.sum()).tolist())
+
+    # 前缀和滑动窗口：每加一颗骰子，新概率为旧分布上长度 faces 的窗口和
+    _check_work(count * size)
+    probs = [1.0 / faces] * faces
+    for _ in range(count - 1):
+        prefix = [0.0]
+        for p in probs:
+            prefix.append(prefix[-1] + p)
+        n = len(probs)
+        probs = [(prefix[min(i + 1, n)] - prefix[max(0, i - faces + 1)]) / faces for i in range(n + faces - 1)]
+    return Distribution(count, probs)
+
+
+def _keep_highest(count: int, faces: int, keep: int) -> Distribution:
+    """
+    count 个 faces 面骰保留最高 keep 个之和。
+    面值从高到低依次决定有几颗骰子取该值：状态为（已定骰子数 j < keep, 已保留点数和），
+    一旦 j 达到 keep，剩余骰子只需小于当前面值，方案数为 (v-1)^(剩余个数)，直接计入结果。
+    计数使用整数，最后除以 faces^count，结果精确。
+    """
+    _check_work(faces * faces * keep * keep * count, KEEP_WORK_LIMIT)
+
+    final = {}
+    layer = [dict() for _ in range(keep)]
+    layer[0][0] = 1
+    for v in range(faces, 0, -1):
+        nxt = [dict() for _ in range(keep)]
+        for j in range(keep):
+            rest = count - j
+            for s, ways in layer[j].items():
+                for c in range(rest + 1):
+                    w = ways * math.comb(rest, c)
+                    nj = j + c
+                    if nj >= keep:
+                        w *= (v - 1) ** (count - nj)
+                        if w:
+                            ns = s + (keep - j) * v
+                            final[ns] = final.get(ns, 0) + w
+                    else:
+                        ns = s + c * v
+                        nxt[nj][ns] = nxt[nj].get(ns, 0) + w
+        layer = nxt
+
+    total = faces ** count
+    return _from_dict({s: w / total for s, w in final.items()})
+
+
+def _vampire_odds(count: int, faces: int, difficulty: int) -> VampireOdds:
+    """
+    吸血鬼骰：每颗骰子为“成功（≥难度且不为 1）/ 1 / 其他”三类之一，
+    按三类的个数 (s, o) 做多项分布计数。净成功数 s - o > 0 为成功，
+    否则出现 1 且无成功为大失败，其余为失败（与 roll_backend 的判定一致）。
+    """
+    success_faces = max(0, faces - max(difficulty, 2) + 1)
+    other_faces = faces - 1 - success_faces
+    total = faces ** count
+
+    successes = {}
+    failure = botch = 0
+    for s in range(count + 1):
+        for o in range(count - s + 1):
+            ways = math.comb(count, s) * math.comb(count - s, o) * success_faces ** s * other_faces ** (count - s - o)
+            if not ways:
+                continue
+            if s - o > 0:
+                successes[s - o] = successes.get(s - o, 0) + ways
+            elif o > 0 and s == 0:
+                botch += ways
+            else:
+                failure += ways
+
+    return VampireOdds(
+        {n: w / total for n, w in sorted(successes.items())},
+        failure / total,
+        botch / total,
+    )
+
+
+def _coc_bonus(bonus_dice: int, penalty_dice: int) -> Distribution:
+    """
+    COC 奖励/惩罚骰（与 dice._roll_term 一致）：十位取 1+n 个 0~9 的最小/最大值，个位 0~9 均匀。
+    """
+    n = 1 + max(bonus_dice, penalty_dice)
+    probs = []
+    for t in range(10):
+        if bonus_dice > 0:
+            p_tens = ((10 - t) / 10) ** n - ((9 - t) / 10) ** n
+        else:
+            p_tens = ((t + 1) / 10) ** n - (t / 10) ** n
+        probs.extend([p_tens / 10] * 10)
+    return Distribution(0, probs)
+
+
+def _term_distribution(term: DiceTerm) -> Distribution:
+    keep = min(term.keep, term.count)
+    if keep <= 0:
+        return Distribution(0, [1.0])
+    if keep < term.count:
+        return _keep_highest(term.count, term.faces, keep)
+    return _uniform_sum(term.count, term.faces)
+
+
+def _combine(op: str, left: Distribution, right: Distribution) -> Distribution:
+    if op == "+":
+        return _convolve(left, right)
+    if op == "-":
+        return _convolve(left, right.negate())
+
+    # 乘除没有卷积结构，逐对枚举
+    if op == "/" and right.low <= 0 <= right.high and right.probs[-right.offset] > 0:
+        raise DistributionError("⚠️ 除数可能为 0，无法计算分布！")
+    _check_work(len(left.probs) * len(right.probs))
+    func = OPERATORS[op]
+    weights = {}
+    right_items = list(right.items())
+    for a, pa in left.items():
+        for b, pb in right_items:
+            v = func(a, b)
+            weights[v] = weights.get(v, 0.0) + pa * pb
+    return _from_dict(weights)
+
+
+def _node_distribution(node, program) -> Distribution:
+    if isinstance(node, Const):
+        return Distribution(node.value, [1.0])
+    if isinstance(node, DiceTerm):
+        if node.count == 1 and node.faces == 100 and (program.bonus_dice > 0 or program.penalty_dice > 0):
+            return _coc_bonus(program.bonus_dice, program.penalty_dice)
+        return _term_distribution(node)
+    return _combine(node.op, _node_distribution(node.left, program), _node_distribution(node.right, program))
+
+
+def expression_distribution(expression: str):
+    """
+    计算表达式单次掷骰结果的精确分布。
+    返回 (DiceProgram, Distribution 或 VampireOdds)；无法计算时抛出 DistributionError。
+    """
+    return _distribution(normalize_expression(expression))
+
+
+def distribution_cache_info():
+    return _distribution.cache_info()
+
+
+@lru_cache(maxsize=DIST_CACHE_SIZE)
+def _distribution(expression: str):
+    program = compile_expression(expression)
+    if program.error:
+        raise DistributionError(program.error)
+
+    if program.vampire:
+        # 吸血鬼骰不计算总和，只支持单独一项
+        root = program.root
+        if not isinstance(root, DiceTerm):
+            raise DistributionError("⚠️ 吸血鬼骰只能单独计算分布！")
+        return program, _vampire_odds(root.count, root.faces, root.vampire)
+
+    return program, _node_distribution(program.root, program)
+
+
+@lru_cache(maxsize=ODDS_CACHE_SIZE)
+def success_tier_odds(skill_value: int, rule: int) -> dict:
+    """d100（1~100 均匀）对技能值 skill_value 在规则 rule 下各检定等级的概率"""
+    counts = dict.fromkeys(ROLL_TIERS, 0)
+    for roll in range(1, 101):
+        counts[classify_roll(roll, skill_value, rule)] += 1
+    return {tier: n / 100 for tier, n in counts.items()}
+
+
+def _pct(p: float) -> str:
+    if 0 < p < 0.0001:
+        return f"{p * 100:.2g}%"
+    return f"{p * 100:.2f}%"
+
+
+def _fmt_num(x: float) -> str:
+    return f"{x:.2f}".rstrip("0").rstrip(".")
+
+
+def format_distribution(expression: str, name: str) -> str:
+    """.r dist 的输出文本"""
+    try:
+        program, dist = expression_distribution(expression)
+    except DistributionError as e:
+        return get_output("dist.error", error=str(e))
+
+    repeat = get_output("dist.repeat", times=program.roll_times) if program.roll_times > 1 else ""
+
+    if isinstance(dist, VampireOdds):
+        lines = [f"成功数 {n}：{_pct(p)}" for n, p in dist.successes.items()]
+        return get_output(
+            "dist.vampire",
+            name=name,
+            expr=expression,
+            repeat=repeat,
+            success=_pct(sum(dist.successes.values())),
+            detail="\n".join(lines),
+            failure=_pct(dist.failure),
+            botch=_pct(dist.botch),
+        )
+
+    outcomes = list(dist.items())
+    if len(outcomes) <= TABLE_MAX_ROWS:
+        lines = []
+        acc = 1.0
+        for v, p in outcomes:
+            lines.append(f"{v}：{_pct(p)}（≥{v}：{_pct(max(acc, 0.0))}）")
+            acc -= p
+        detail = "\n".join(lines)
+    else:
+        detail = "，".join(f"{label} {dist.quantile(q)}" for q, label in QUANTILES)
+
+    return get_output(
+        "dist.result",
+        name=name,
+        expr=expression,
+        repeat=repeat,
+        low=dist.low,
+        high=dist.high,
+        mean=_fmt_num(dist.mean()),
+        stdev=_fmt_num(dist.stdev()),
+        detail=detail,
+    )
+
+
+def format_tier_odds(skill_name: str, skill_value, group: str, name: str) -> str:
+    """.ra odds 的输出文本：列出四种大成功/大失败规则下的概率，并标出本群当前规则"""
+    try:
+        skill_value = int(skill_value)
+    except (TypeError, ValueError):
+        return get_output("skill_check.error.normal", skill_name=skill_name)
+
+    current = get_great_sf_rule(group)
+    lines = []
+    for rule in range(1, len(GREAT_SF_RULE_STR)):
+        odds = success_tier_odds(skill_value, rule)
+        total = odds["great_success"] + odds["extreme_success"] + odds["hard_success"] + odds["success"]
+        tiers = " / ".join(f"{TIER_NAMES[t]} {_pct(odds[t])}" for t in ROLL_TIERS[:4])
+        mark = "▶" if rule == current else "　"
+        lines.append(
+            f"{mark}{rule} {GREAT_SF_RULE_STR[rule]}：成功率 {_pct(total)}（{tiers}），大失败 {_pct(odds['great_failure'])}"
+        )
+
+    return get_output("odds.result", name=name, skill_name=skill_name, skill_value=skill_value, detail="\n".join(lines))
@@ -0,0 +1,93 @@
+import os
+import random
+import threading
+import contextvars
+import importlib.util
+
+# 随机数流：每个群（私聊按用户）各自持有一个 random.Random 与一个 NumPy PCG64 Generator，
+# 首次使用时由 os.urandom 播种一次，之后不再重新播种，也不触碰全局 random 模块的状态。
+# 处理指令前由 bind_stream() 绑定当前消息所属的流（contextvar，随 run_io 传入线程池），
+# 各模块通过 get_random() / get_generator() 取得当前流。
+
+GLOBAL_STREAM = "global"
+
+_current_stream = contextvars.ContextVar("rng_stream", default=GLOBAL_STREAM)
+
+_streams = {}       # { key: random.Random }
+_np_streams = {}    # { key: numpy.random.Generator }
+_lock = threading.Lock()
+
+# NumPy 为可选依赖，且导入约需 90 ms：只在第一次真正用到（大骰池、分布计算）时导入，
+# 纯 Python 路径不会触发导入。None 表示尚未尝试导入，False 表示不可用。
+_numpy = None
+_numpy_lock = threading.Lock()
+
+
+def _seed() -> int:
+    return int.from_bytes(os.urandom(16), "big")
+
+
+def stream_key(group_id=None, user_id=None) -> str:
+    """群聊按群区分，私聊按用户区分"""
+    if group_id:
+        return f"group:{group_id}"
+    if user_id:
+        return f"user:{user_id}"
+    return GLOBAL_STREAM
+
+
+def bind_stream(group_id=None, user_id=None) -> str:
+    """把当前上下文绑定到对应的随机数流"""
+    key = stream_key(group_id, user_id)
+    _current_stream.set(key)
+    return key
+
+
+def numpy_available() -> bool:
+    """NumPy 是否可用（只查找模块，不导入）"""
+    if _numpy is None:
+        return importlib.util.find_spec("numpy") is not None
+    return _numpy is not False
+
+
+def get_numpy():
+    """NumPy 模块（首次调用时导入）；不可用时返回 None"""
+    global _numpy
+    if _numpy is None:
+        with _numpy_lock:
+            if _numpy is None:
+                try:
+                    import numpy
+                    _numpy = numpy
+                except ImportError:
+                    _numpy = False
+    return _numpy or None
+
+
+def get_random(key: str = None) -> random.Random:
+    """当前（或指定）流的 random.Random"""
+    key = _current_stream.get() if key is None else key
+    rng = _streams.get(key)
+    if rng is None:
+        with _lock:
+            rng = _streams.setdefault(key, random.Random(_seed()))
+    return rng
+
+
+def get_generator(key: str = None):
+    """当前（或指定）流的 NumPy Generator（PCG64）；NumPy 不可用时返回 None"""
+    key = _current_stream.get() if key is None else key
+    gen = _np_streams.get(key)
+    if gen is None:
+        np = get_numpy()
+        if np is None:
+            return None
+        with _lock:
+            gen = _np_streams.get(key)
+            if gen is None:
+                gen = _np_streams[key] = np.random.Generator(np.random.PCG64(_seed()))
+    return gen
+
+
+def stream_count() -> int:
+    return len(_streams)
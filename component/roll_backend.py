@@ -0,0 +1,80 @@
+from .output import get_setting
+from .rng import get_random, get_generator, get_numpy, numpy_available
+
+# 掷骰后端：一次性掷出整个骰池（含 N# 的全部重复），并计算保留最高、成功数、总和。
+# dice_backend 设置：auto（默认，骰子数较多时使用 NumPy）/ python / numpy
+# NumPy 为可选依赖，在第一次走 NumPy 路径时才导入；小骰池与 python 后端不会导入它
+HAS_NUMPY = numpy_available()
+BACKEND = str(get_setting("dice_backend", "auto")).lower()
+# auto 模式下，骰子总数达到该值才使用 NumPy（小骰池时 NumPy 的调用开销反而更大）
+NUMPY_MIN_POOL = 16
+
+
+def use_numpy(pool_size: int) -> bool:
+    if not HAS_NUMPY or BACKEND == "python":
+        return False
+    return BACKEND == "numpy" or pool_size >= NUMPY_MIN_POOL
+
+
+def _generator(pool_size: int):
+    """需要走 NumPy 时返回当前流的 Generator；NumPy 已安装但导入失败时为 None，调用方退回纯 Python"""
+    return get_generator() if use_numpy(pool_size) else None
+
+
+def draw(count: int, faces: int) -> list:
+    """掷 count 个 faces 面骰，返回原始顺序的结果列表"""
+    gen = _generator(count)
+    if gen is not None:
+        return gen.integers(1, faces + 1, size=count).tolist()
+    rng = get_random()
+    return [rng.randint(1, faces) for _ in range(count)]
+
+
+def roll_pools(times: int, count: int, faces: int, keep: int, vampire=None) -> list:
+    """
+    掷 times 组、每组 count 个 faces 面骰。
+    返回每组的 (原始结果, 降序结果, 值)：
+    - 普通骰：值为保留最高 keep 个骰子之和；不需要舍弃时降序结果为 None
+    - 吸血鬼骰：值为 (成功数, 是否大失败)
+    """
+    gen = _generator(times * count)
+    if gen is not None:
+        return _roll_pools_numpy(gen, times, count, faces, keep, vampire)
+
+    rng = get_random()
+    pools = []
+    for _ in range(times):
+        rolls = [rng.randint(1, faces) for _ in range(count)]
+        if vampire:
+            sorted_rolls = sorted(rolls, reverse=True)
+            successes = sum(1 for r in rolls if r >= vampire and r != 1)
+            ones = rolls.count(1)
+            pools.append((rolls, sorted_rolls, (successes - ones, ones > 0 and successes == 0)))
+        elif keep < count:
+            sorted_rolls = sorted(rolls, reverse=True)
+            pools.append((rolls, sorted_rolls, sum(sorted_rolls[:keep])))
+        else:
+            pools.append((rolls, None, sum(rolls)))
+    return pools
+
+
+def _roll_pools_numpy(gen, times: int, count: int, faces: int, keep: int, vampire=None) -> list:
+    np = get_numpy()
+    block = gen.integers(1, faces + 1, size=(times, count))
+    rolls = block.tolist()
+
+    if vampire:
+        sorted_rolls = (-np.sort(-block, axis=1)).tolist()
+        ones = np.count_nonzero(block == 1, axis=1)
+        successes = np.count_nonzero((block >= vampire) & (block != 1), axis=1)
+        values = zip((successes - ones).tolist(), ((ones > 0) & (successes == 0)).tolist())
+        return list(zip(rolls, sorted_rolls, values))
+
+    if keep < count:
+        # 输出需要列出保留/舍弃的骰子，整行排序后直接取前 keep 列求和
+        sorted_block = -np.sort(-block, axis=1)
+        sums = np.sum(sorted_block[:, :keep], axis=1)
+        return list(zip(rolls, sorted_block.tolist(), sums.tolist()))
+
+    sums = np.sum(block, axis=1).tolist()
+    return [(r, None, s) for r, s in zip(rolls, sums)]
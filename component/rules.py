@@ -1,10 +1,17 @@
 import os
+import shutil
 import sqlite3
+import threading
 
-from .output import get_output
+from .output import get_output, get_setting
 
 PLUGIN_DIR = os.path.dirname(os.path.abspath(__file__))
 
+# data/cocrule.db 随插件发布，只作为初始数据、从不写入；
+# 首次使用时复制到 rule_db_path（默认 data/group_rules.db），之后的读写（含 WAL）都在副本上进行。
+BUNDLED_RULE_DB = os.path.join(PLUGIN_DIR, "..", "data", "cocrule.db")
+RULE_DB_PATH = get_setting("rule_db_path") or os.path.join(PLUGIN_DIR, "..", "data", "group_rules.db")
+
 GREAT_SF_RULE_DEFAULT = 1
 GREAT_SF_RULE_STR = ["", "严格规则", "COC7版规则", "阶段性规则", "宽松规则"]
 
@@ -27,6 +34,79 @@ GREAT_SF_RULE_STR = ["", "严格规则", "COC7版规则", "阶段性规则", "
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 GLOBAL_SET = True
 
+# 各群规则的内存缓存 { group_id: rule }。启动时从 cocrule.db 一次性载入，
+# set_great_sf_rule 写库的同时更新缓存，检定时 get_great_sf_rule 只查这里。
+# 重新载入时整体替换为新 dict（读者要么看到旧表、要么看到新表，不会看到清空后的半张表），
+# 载入与写入由 _rule_cache_lock 串行，避免载入到的旧快照覆盖刚写入的规则。
+_rule_cache = {}
+_rule_cache_loaded = False
+_rule_cache_lock = threading.Lock()
+
+class RuleRepository:
+    '''
+    Access object of cocrule.db.
+    Holds one long-lived connection (WAL mode) shared by every group; the
+    schema is created once on first use and all statements are parameterized.
+    The connection may be used from the I/O thread pool, so every call is
+    serialized by an internal lock.
+    If db_path does not exist yet it is first copied from seed_path, so the
+    seed file itself is never opened for writing.
+    '''
+
+    def __init__(self, db_path:str, seed_path:str = None):
+        self.db_path = db_path
+        self.seed_path = seed_path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self)->sqlite3.Connection:
+        # caller must hold self._lock
+        if self._conn is None:
+            if not os.path.exists(self.db_path):
+                os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+                if self.seed_path and os.path.isfile(self.seed_path):
+                    shutil.copyfile(self.seed_path, self.db_path)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS GroupRule(GroupID VARCHAR(15) PRIMARY KEY, Rule INTEGER)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def init_schema(self):
+        with self._lock:
+            self._connect()
+
+    def fetch(self, group:str):
+        '''
+        Returns:
+            The stored rule of given group, None for group not exist.
+        '''
+        with self._lock:
+            row = self._connect().execute("SELECT Rule FROM GroupRule WHERE GroupID = ?", (str(group),)).fetchone()
+        return None if row is None else row[0]
+
+    def fetch_all(self)->list:
+        with self._lock:
+            return self._connect().execute("SELECT GroupID, Rule FROM GroupRule").fetchall()
+
+    def upsert(self, group:str, rule:int):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO GroupRule(GroupID, Rule) VALUES (?, ?)", (str(group), int(rule)))
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+_repo = RuleRepository(RULE_DB_PATH, BUNDLED_RULE_DB)
+
+def get_rule_repository()->RuleRepository:
+    return _repo
+
 def coc_rule_init():
     '''
     Create table of cocrule.db
@@ -35,11 +115,27 @@ def coc_rule_init():
     Returns:
         None.
     '''
-    ruledb = sqlite3.connect(f"{PLUGIN_DIR}/../data/cocrule.db")
-    csr = ruledb.cursor()
-    csr.execute('CREATE TABLE IF NOT EXISTS GroupRule(GroupID VARCHAR(15) PRIMARY KEY, Rule INTEGER);')
-    ruledb.commit()
-    ruledb.close()
+    _repo.init_schema()
+
+def load_rule_cache():
+    '''
+    Load every group rule from cocrule.db into the in-memory cache.
+    Args:
+        None.
+    Returns:
+        int: number of groups loaded.
+    '''
+    global _rule_cache, _rule_cache_loaded
+    with _rule_cache_lock:
+        cache = {}
+        for group, rule in _repo.fetch_all():
+            try:
+                cache[str(group)] = int(rule)
+            except (TypeError, ValueError):
+                continue
+        _rule_cache = cache
+        _rule_cache_loaded = True
+    return len(cache)
 
 def fetch_group_rule(group:str)->int:
     '''
@@ -49,21 +145,13 @@ def fetch_group_rule(group:str)->int:
     Returns:
         int: rule id, -1 for group not exist.
     '''
-    # db connection
-    ruledb = sqlite3.connect(f"{PLUGIN_DIR}/../data/cocrule.db")
-    csr = ruledb.cursor()
-    
-    # search for existence
     try:
-        csr.execute(f"SELECT Rule FROM GroupRule WHERE GroupID = \"{group}\"")
-    except:
-        ruledb.close()
+        res = _repo.fetch(group)
+    except sqlite3.Error:
         return -1   # Selecting Failed
-    res = csr.fetchone()
-    ruledb.close()
     if res is None:
         return -1
-    return int(res[0])    # Exec Succeed
+    return int(res)    # Exec Succeed
 
 def great_success_range(skill_level:int, rule:int)->list:
     '''
@@ -113,6 +201,32 @@ def great_failure_range(skill_level:int, rule:int)->list:
     
     return res
 
+# 检定结果等级，对应 coc_roll.results 下的输出模板
+ROLL_TIERS = ["great_success", "extreme_success", "hard_success", "success", "failure", "great_failure"]
+
+def classify_roll(roll_result:int, skill_value:int, rule:int)->str:
+    '''
+    Classify a d100 roll against skill level under given rule.
+    Args:
+        roll_result(int): d100 result, 1~100.
+        skill_value(int): Skill level of ra check.
+        rule(int): rule id.
+    Returns:
+        str: one of ROLL_TIERS.
+    '''
+    if roll_result in great_success_range(skill_value, rule):
+        return "great_success"
+    elif roll_result <= skill_value / 5:
+        return "extreme_success"
+    elif roll_result <= skill_value / 2:
+        return "hard_success"
+    elif roll_result <= skill_value:
+        return "success"
+    elif roll_result in great_failure_range(skill_value, rule):
+        return "great_failure"
+    else:
+        return "failure"
+
 def set_great_sf_rule(rule:int, group:str)->int:
     '''
     Change rule # in given group.
@@ -122,60 +236,29 @@ def set_great_sf_rule(rule:int, group:str)->int:
     Returns:
         int: 1 for succeed, neg number for error. 
     '''
-
-    # db connection
-    ruledb = sqlite3.connect(f"{PLUGIN_DIR}/../data/cocrule.db")
-    csr = ruledb.cursor()
-
     if rule < 1 or rule > 4:
         rule = GREAT_SF_RULE_DEFAULT
-    
-    # search for existence
-    csr.execute(f"SELECT * FROM GroupRule WHERE GroupID = \"{group}\"")
-    
-    res = csr.fetchone()
-    if res == None:
-        # create new record
-        csr.execute(f"INSERT INTO GroupRule VALUES (\"{group}\", {rule});")
-        
-    else:
-        # modify rule
-        csr.execute(f"UPDATE GroupRule SET Rule = {rule} WHERE GroupID = \"{group}\";")
-        
-    ruledb.commit()
-    ruledb.close()
+
+    with _rule_cache_lock:
+        _repo.upsert(group, rule)
+        _rule_cache[str(group)] = rule
     return 1    # Exec Succeed
 
 def get_great_sf_rule(group:str)->int:
     '''
-    Ask rule # in given group.
+    Ask rule # in given group (served from the in-memory cache).
     Args:
         group(str): QQ group id.
     Returns:
-        int: rule id, -1 for group not exist.
+        int: rule id, GREAT_SF_RULE_DEFAULT for group not exist.
     '''
-    # ensure DB/table exists
-    coc_rule_init()
+    if not _rule_cache_loaded:
+        try:
+            load_rule_cache()
+        except sqlite3.Error:
+            return GREAT_SF_RULE_DEFAULT   # Loading Failed, fallback to default
 
-    # db connection
-    ruledb = sqlite3.connect(f"{PLUGIN_DIR}/../data/cocrule.db")
-    csr = ruledb.cursor()
-
-    # search for existence
-    try:
-        csr.execute(f"SELECT Rule FROM GroupRule WHERE GroupID = \"{group}\"")
-    except:
-        ruledb.close()
-        return GREAT_SF_RULE_DEFAULT   # Selecting Failed, fallback to default
-
-    res = csr.fetchone()
-    ruledb.close()
-    if res is None:
-        return GREAT_SF_RULE_DEFAULT
-    try:
-        return int(res[0])    # Exec Succeed
-    except:
-        return GREAT_SF_RULE_DEFAULT
+    return _rule_cache.get(str(group), GREAT_SF_RULE_DEFAULT)
 
 
 def modify_coc_great_sf_rule_command(group_id, command: str = " "):
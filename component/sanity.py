@@ -1,17 +1,36 @@
-import random
 import re
 import os
 import json
+from functools import lru_cache
+
+from .rng import get_random
 
 PLUGIN_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# 恐惧
-with open(PLUGIN_DIR + "/../data/phobias.json", "r", encoding="utf-8") as f:
-    phobias = json.load(f)["phobias"]
+# 恐惧症 / 躁狂症表在首次 .ti / .li 用到时才读入，导入本模块不做磁盘 I/O。
+# 读入后存为按骰值索引的元组：table[骰值] 即对应症状（下标 0 不用）。
+_TABLE_FILES = {
+    "phobias": "phobias.json",      # 恐惧
+    "manias": "mania.json",         # 躁狂
+}
+
+
+@lru_cache(maxsize=None)
+def load_table(name: str) -> tuple:
+    """读入恐惧症（phobias）或躁狂症（manias）表"""
+    with open(os.path.join(PLUGIN_DIR, "..", "data", _TABLE_FILES[name]), "r", encoding="utf-8") as f:
+        entries = json.load(f)[name]
+    table = [None] * (max(int(k) for k in entries) + 1)
+    for k, v in entries.items():
+        table[int(k)] = v
+    return tuple(table)
+
 
-# 躁狂
-with open(PLUGIN_DIR + "/../data/mania.json", "r", encoding="utf-8") as f:
-    manias = json.load(f)["manias"]
+def __getattr__(name):
+    # 兼容旧代码中的 sanity.phobias / sanity.manias
+    if name in _TABLE_FILES:
+        return load_table(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def parse_san_loss_formula(formula: str):
     """
@@ -31,7 +50,8 @@ def roll_loss(loss_expr: str):
     match = re.fullmatch(r"(\d+)d(\d+)", loss_expr)
     if match:
         num_dice, dice_size = map(int, match.groups())
-        return sum(random.randint(1, dice_size) for _ in range(num_dice))
+        rng = get_random()
+        return sum(rng.randint(1, dice_size) for _ in range(num_dice))
     elif loss_expr.isdigit():
         return int(loss_expr)
     return 0
@@ -44,7 +64,7 @@ def san_check(chara_data: dict, loss_formula: str):
     返回：(roll_result, san_value, result_msg, loss, new_san)
     """
     san_value = chara_data["attributes"].get("san", 0)
-    roll_result = random.randint(1, 100)
+    roll_result = get_random().randint(1, 100)
     success_loss, failure_loss = parse_san_loss_formula(loss_formula)
 
     if roll_result <= san_value:
@@ -57,11 +77,12 @@ def san_check(chara_data: dict, loss_formula: str):
     new_san = max(0, san_value - loss)
     return roll_result, san_value, result_msg, loss, new_san
 
-def get_temporary_insanity(phobias: dict, manias: dict):
+def get_temporary_insanity(phobias: tuple = None, manias: tuple = None):
     """
     随机生成临时疯狂症状，返回症状文本。
-    phobias, manias: 恐惧症和躁狂症字典
+    phobias, manias: 恐惧症和躁狂症表（按骰值索引），默认使用 data 下的表
     """
+    rng = get_random()
     temporary_insanity = {
         1: "失忆：调查员只记得最后身处的安全地点，却没有任何来到这里的记忆。这将会持续 1D10 轮。",
         2: "假性残疾：调查员陷入心理性的失明、失聪或躯体缺失感，持续 1D10 轮。",
@@ -74,21 +95,24 @@ def get_temporary_insanity(phobias: dict, manias: dict):
         9: "恐惧：骰 1D100 或由守秘人选择一个恐惧症，调查员会想象它存在，持续 1D10 轮。",
         10: "躁狂：骰 1D100 或由守秘人选择一个躁狂症，调查员会沉溺其中，持续 1D10 轮。"
     }
-    roll = random.randint(1, 10)
-    result = temporary_insanity[roll].replace("1D10", str(random.randint(1, 10)))
+    roll = rng.randint(1, 10)
+    result = temporary_insanity[roll].replace("1D10", str(rng.randint(1, 10)))
     if roll == 9:
-        fear_roll = random.randint(1, 100)
-        result += f"\n→ 具体恐惧症：{phobias[str(fear_roll)]}（骰值 {fear_roll}）"
+        fear_roll = rng.randint(1, 100)
+        phobias = phobias or load_table("phobias")
+        result += f"\n→ 具体恐惧症：{phobias[fear_roll]}（骰值 {fear_roll}）"
     if roll == 10:
-        mania_roll = random.randint(1, 100)
-        result += f"\n→ 具体躁狂症：{manias[str(mania_roll)]}（骰值 {mania_roll}）"
+        mania_roll = rng.randint(1, 100)
+        manias = manias or load_table("manias")
+        result += f"\n→ 具体躁狂症：{manias[mania_roll]}（骰值 {mania_roll}）"
     return result
 
-def get_long_term_insanity(phobias: dict, manias: dict):
+def get_long_term_insanity(phobias: tuple = None, manias: tuple = None):
     """
     随机生成长期疯狂症状，返回症状文本。
-    phobias, manias: 恐惧症和躁狂症字典
+    phobias, manias: 恐惧症和躁狂症表（按骰值索引），默认使用 data 下的表
     """
+    rng = get_random()
     long_term_insanity = {
         1: "失忆：调查员发现自己身处陌生地方，并忘记自己是谁。记忆会缓慢恢复。",
         2: "被窃：调查员 1D10 小时后清醒，发现自己身上贵重物品丢失。",
@@ -101,12 +125,14 @@ def get_long_term_insanity(phobias: dict, manias: dict):
         9: "恐惧：调查员患上一种新的恐惧症（骰 1D100 或由守秘人选择）。",
         10: "躁狂：调查员患上一种新的躁狂症（骰 1D100 或由守秘人选择）。"
     }
-    roll = random.randint(1, 10)
-    result = long_term_insanity[roll].replace("1D10", str(random.randint(1, 10)))
+    roll = rng.randint(1, 10)
+    result = long_term_insanity[roll].replace("1D10", str(rng.randint(1, 10)))
     if roll == 9:
-        fear_roll = random.randint(1, 100)
-        result += f"\n→ 具体恐惧症：{phobias[str(fear_roll)]}（骰值 {fear_roll}）"
+        fear_roll = rng.randint(1, 100)
+        phobias = phobias or load_table("phobias")
+        result += f"\n→ 具体恐惧症：{phobias[fear_roll]}（骰值 {fear_roll}）"
     if roll == 10:
-        mania_roll = random.randint(1, 100)
-        result += f"\n→ 具体躁狂症：{manias[str(mania_roll)]}（骰值 {mania_roll}）"
+        mania_roll = rng.randint(1, 100)
+        manias = manias or load_table("manias")
+        result += f"\n→ 具体躁狂症：{manias[mania_roll]}（骰值 {mania_roll}）"
     return result
\ No newline at end of file
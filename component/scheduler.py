@@ -0,0 +1,116 @@
+import asyncio
+import contextvars
+import functools
+import inspect
+from contextlib import asynccontextmanager
+from typing import Dict
+
+from .output import get_setting
+
+# 指令调度：同一 (群, 用户) 的指令按到达顺序逐条执行，避免 .st / .pc update / .en / .sc
+# 对人物卡的读-改-写互相覆盖；不同用户、不同群之间并行，总并发数由 command_concurrency 限制。
+# 先排本用户的队（asyncio.Lock 按 FIFO 唤醒），轮到后再占用全局名额，排队中的指令不占名额。
+
+COMMAND_CONCURRENCY = max(1, int(get_setting("command_concurrency", 8)))
+
+# 当前上下文已持有名额的键；identify_command 已排队后再调用带 @serialized 的处理方法时不重复排队
+_held_keys = contextvars.ContextVar("scheduler_held_keys", default=frozenset())
+
+
+class _KeyQueue:
+    __slots__ = ("lock", "pending")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.pending = 0        # 排队中 + 执行中的指令数
+
+
+class CommandScheduler:
+    def __init__(self, max_concurrency: int = COMMAND_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._queues = {}       # { (group, user): _KeyQueue }，空闲后移除
+        self.running = 0
+        self.waiting = 0
+        self.peak_waiting = 0
+        self.peak_queue = 0     # 单个 (群, 用户) 的最长队列
+        self.completed = 0
+
+    @staticmethod
+    def _key(group_id, user_id):
+        return str(group_id or ""), str(user_id or "")
+
+    @asynccontextmanager
+    async def slot(self, group_id, user_id):
+        """
+        async with scheduler.slot(group_id, user_id): ...
+        等到同一用户之前的指令执行完、且有空闲的全局名额后进入。
+        """
+        key = self._key(group_id, user_id)
+        held = _held_keys.get()
+        if key in held:
+            yield
+            return
+
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = _KeyQueue()
+        queue.pending += 1
+        self.peak_queue = max(self.peak_queue, queue.pending)
+        self.waiting += 1
+        self.peak_waiting = max(self.peak_waiting, self.waiting)
+        started = False
+        try:
+            async with queue.lock:
+                async with self._semaphore:
+                    self.waiting -= 1
+                    self.running += 1
+                    started = True
+                    _held_keys.set(held | {key})
+                    try:
+                        yield
+                    finally:
+                        # 不用 token.reset：被丢弃的处理方法可能在别的上下文中收尾
+                        _held_keys.set(held)
+                        self.running -= 1
+                        self.completed += 1
+        finally:
+            if not started:
+                self.waiting -= 1
+            queue.pending -= 1
+            if queue.pending == 0:
+                self._queues.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "running": self.running,
+            "waiting": self.waiting,
+            "peak_waiting": self.peak_waiting,
+            "queues": len(self._queues),
+            "longest_queue": max((q.pending for q in self._queues.values()), default=0),
+            "peak_queue": self.peak_queue,
+            "completed": self.completed,
+        }
+
+
+command_scheduler = CommandScheduler()
+
+
+def serialized(func):
+    """
+    处理方法装饰器：按 event 的 (群, 用户) 排队执行。
+    支持异步生成器（yield 结果）与普通协程两种处理方法。
+    """
+    if inspect.isasyncgenfunction(func):
+        @functools.wraps(func)
+        async def wrapper(self, event, *args, **kwargs):
+            async with command_scheduler.slot(event.get_group_id(), event.get_sender_id()):
+                async for result in func(self, event, *args, **kwargs):
+                    yield result
+    else:
+        @functools.wraps(func)
+        async def wrapper(self, event, *args, **kwargs):
+            async with command_scheduler.slot(event.get_group_id(), event.get_sender_id()):
+                return await func(self, event, *args, **kwargs)
+    return wrapper
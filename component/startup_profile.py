@@ -0,0 +1,126 @@
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+# 启动耗时分析（默认关闭）：设置环境变量 TRPGDICE_PROFILE_STARTUP=1 后，
+# main.py 导入期间每个模块的导入耗时、以及各初始化步骤的耗时会被记录下来，
+# 管理员可用 .dicestartup 查看报告。
+# 本模块只依赖标准库，必须在插件的其他模块之前导入，才能统计到它们。
+# 冷启动预算检查见 tools/startup_budget.py。
+
+ENV_FLAG = "TRPGDICE_PROFILE_STARTUP"
+
+
+class _TimedLoader:
+    """包装模块的 loader，计时 exec_module；模块上看到的仍是原 loader"""
+
+    def __init__(self, loader, profiler):
+        self._loader = loader
+        self._profiler = profiler
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        module.__loader__ = self._loader
+        if getattr(module, "__spec__", None) is not None:
+            module.__spec__.loader = self._loader
+        self._profiler._enter()
+        start = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler._exit(module.__name__, time.perf_counter() - start)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class _TimingFinder:
+    """sys.meta_path 上的查找器：交给其余查找器找到模块后，给 loader 套上计时"""
+
+    def __init__(self, profiler):
+        self._profiler = profiler
+
+    def find_spec(self, name, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is None:
+                continue
+            if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                spec.loader = _TimedLoader(spec.loader, self._profiler)
+            return spec
+        return None
+
+
+class StartupProfiler:
+    def __init__(self):
+        self.enabled = False
+        self.imports = {}       # { 模块名: (累计秒, 自身秒) }，累计含其导入的子模块
+        self.sections = []      # [(初始化步骤, 秒)]，按执行顺序
+        self.import_total = 0.0
+        self._stack = []        # 正在导入的模块的子模块耗时
+        self._finder = None
+        self._import_start = None
+
+    def start(self):
+        """开始记录模块导入（未设置环境变量时什么也不做）"""
+        if self.enabled or not os.environ.get(ENV_FLAG):
+            return
+        self.enabled = True
+        self._finder = _TimingFinder(self)
+        sys.meta_path.insert(0, self._finder)
+        self._import_start = time.perf_counter()
+
+    def stop_imports(self):
+        """停止记录模块导入"""
+        if self._finder is None:
+            return
+        try:
+            sys.meta_path.remove(self._finder)
+        except ValueError:
+            pass
+        self._finder = None
+        self.import_total = time.perf_counter() - self._import_start
+
+    def _enter(self):
+        self._stack.append(0.0)
+
+    def _exit(self, name, elapsed):
+        children = self._stack.pop()
+        self.imports[name] = (elapsed, elapsed - children)
+        if self._stack:
+            self._stack[-1] += elapsed
+
+    @contextmanager
+    def section(self, name: str):
+        """记录一个初始化步骤的耗时：with startup_profiler.section("载入规则表"): ..."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.sections.append((name, time.perf_counter() - start))
+
+    def report(self, top: int = 15) -> str:
+        if not self.enabled:
+            return f"启动分析未开启：设置环境变量 {ENV_FLAG}=1 后重启 AstrBot"
+        lines = [f"插件导入：{self.import_total * 1000:.1f} ms，新导入模块 {len(self.imports)} 个"]
+        ranked = sorted(self.imports.items(), key=lambda item: item[1][1], reverse=True)[:top]
+        if ranked:
+            lines.append(f"导入最慢的 {len(ranked)} 个模块（自身 / 累计）：")
+            for name, (total, own) in ranked:
+                lines.append(f"  {name}: {own * 1000:.1f} / {total * 1000:.1f} ms")
+        if self.sections:
+            lines.append("初始化步骤：")
+            for name, elapsed in self.sections:
+                lines.append(f"  {name}: {elapsed * 1000:.1f} ms")
+        return "\n".join(lines)
+
+
+startup_profiler = StartupProfiler()
@@ -1,20 +1,63 @@
-import random
-from faker import Faker
+import threading
+from collections import OrderedDict
 
-def generate_names(language="cn", num=5, sex=None):
-    """
-    批量生成随机名字，支持多语言和性别。
-    """
+from .rng import get_random
+from .output import get_setting
+
+# Faker 导入较慢且每次构造 Faker(locale=...) 都会重新载入 provider，
+# 这里在首次 .name 时才导入，并按 locale 缓存最近使用的几个实例（LRU）。
+FAKER_POOL_SIZE = max(1, int(get_setting("faker_pool_size", 4)))
+
+_Faker = None
+_faker_pool = OrderedDict()     # { locale: Faker }
+_faker_lock = threading.Lock()
+
+
+def _language_locale(language):
+    """把 .name 的语言参数转换为 Faker 的 locale，未识别时为 None（Faker 默认）"""
     if language == "cn" or "中" in language or language == "zh" or language == "zh_CN":
-        fake = Faker(locale="zh_CN")
+        return "zh_CN"
     elif language == "en" or "英" in language or language == "en_GB":
-        fake = Faker(locale="en_GB")
+        return "en_GB"
     elif language == "us" or "美" in language or language == "en_US":
-        fake = Faker(locale="en_US")
+        return "en_US"
     elif language == "jp" or "=日" in language or language == "ja_JP":
-        fake = Faker(locale="ja_JP")
-    else:
-        fake = Faker()
+        return "ja_JP"
+    return None
+
+
+def get_faker(locale=None):
+    """取指定 locale 的 Faker 实例（首次调用时导入 faker）"""
+    global _Faker
+    with _faker_lock:
+        fake = _faker_pool.get(locale)
+        if fake is not None:
+            _faker_pool.move_to_end(locale)
+            return fake
+        if _Faker is None:
+            from faker import Faker
+            _Faker = Faker
+        fake = _Faker(locale=locale) if locale else _Faker()
+        _faker_pool[locale] = fake
+        while len(_faker_pool) > FAKER_POOL_SIZE:
+            _faker_pool.popitem(last=False)
+        return fake
+
+
+def warm_up_faker(locales) -> int:
+    """预先导入 faker 并构造给定 locale 的实例（插件启动后在后台调用），返回构造的数量"""
+    count = 0
+    for locale in locales:
+        get_faker(locale or None)
+        count += 1
+    return count
+
+
+def generate_names(language="cn", num=5, sex=None):
+    """
+    批量生成随机名字，支持多语言和性别。
+    """
+    fake = get_faker(_language_locale(language))
 
     if sex == "男":
         names = [fake.name_male() for _ in range(num)]
@@ -46,19 +89,20 @@ def roll_character():
     """
     生成一个CoC角色属性字典。
     """
-    STR = (random.randint(1, 6) + random.randint(1, 6) + random.randint(1, 6)) * 5
-    CON = (random.randint(1, 6) + random.randint(1, 6) + random.randint(1, 6)) * 5
-    SIZ = (random.randint(1, 6) + random.randint(1, 6) + 6) * 5
-    DEX = (random.randint(1, 6) + random.randint(1, 6) + random.randint(1, 6)) * 5
-    APP = (random.randint(1, 6) + random.randint(1, 6) + random.randint(1, 6)) * 5
-    INT = (random.randint(1, 6) + random.randint(1, 6) + 6) * 5
-    POW = (random.randint(1, 6) + random.randint(1, 6) + random.randint(1, 6)) * 5
-    EDU = (random.randint(1, 6) + random.randint(1, 6) + 6) * 5
+    rng = get_random()
+    STR = (rng.randint(1, 6) + rng.randint(1, 6) + rng.randint(1, 6)) * 5
+    CON = (rng.randint(1, 6) + rng.randint(1, 6) + rng.randint(1, 6)) * 5
+    SIZ = (rng.randint(1, 6) + rng.randint(1, 6) + 6) * 5
+    DEX = (rng.randint(1, 6) + rng.randint(1, 6) + rng.randint(1, 6)) * 5
+    APP = (rng.randint(1, 6) + rng.randint(1, 6) + rng.randint(1, 6)) * 5
+    INT = (rng.randint(1, 6) + rng.randint(1, 6) + 6) * 5
+    POW = (rng.randint(1, 6) + rng.randint(1, 6) + rng.randint(1, 6)) * 5
+    EDU = (rng.randint(1, 6) + rng.randint(1, 6) + 6) * 5
 
     HP = (SIZ + CON) // 10
     MP = POW // 5
     SAN = POW
-    LUCK = ((random.randint(1, 6) + random.randint(1, 6) + random.randint(1, 6)) * 5)
+    LUCK = ((rng.randint(1, 6) + rng.randint(1, 6) + rng.randint(1, 6)) * 5)
     DB, BUILD = get_db_build(STR, SIZ)
     TOTAL = STR + CON + SIZ + DEX + APP + INT + POW + EDU
 
@@ -86,7 +130,8 @@ def roll_4d6_drop_lowest():
     """
     掷4d6去最低，返回总和。
     """
-    rolls = [random.randint(1, 6) for _ in range(4)]
+    rng = get_random()
+    rolls = [rng.randint(1, 6) for _ in range(4)]
     return sum(sorted(rolls)[1:])
 
 def roll_dnd_character():
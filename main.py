@@ -1,7 +1,11 @@
-import random
+# 启动耗时分析（默认关闭，见 component/startup_profile.py），需先于其他导入
+from .component.startup_profile import startup_profiler
+startup_profiler.start()
+
 import datetime
 import hashlib
 import ast
+import inspect
 from typing import Optional
 
 from astrbot.api.event import filter, AstrMessageEvent
@@ -14,22 +18,31 @@ from astrbot.api import logger
 import json
 import re
 import time
+import asyncio
 import os
 import uuid
 import sqlite3
-from faker import Faker
 
 # ========== MODULE IMPORT ========== #
 from .component import character as charmod
 from .component import dice as dice_mod
 from .component import sanity
 from .component import fu as fu_mod
-from .component.output import get_output
-from .component.utils import generate_names, roll_character, format_character, roll_dnd_character, format_dnd_character
-from .component.rules import modify_coc_great_sf_rule_command
+from .component.output import get_output, get_setting, config_changed, reload_config
+from .component.utils import generate_names, warm_up_faker, roll_character, format_character, roll_dnd_character, format_dnd_character
+from .component.rules import modify_coc_great_sf_rule_command, load_rule_cache, get_rule_repository
 from .component.log import JSONLoggerCore
-
-logger_core = JSONLoggerCore()
+from .component.io_pool import run_io, io_stats, shutdown_io
+from .component.dice_expr import compile_cache_info
+from .component.rng import bind_stream, get_random, stream_count
+from .component.nickname_cache import nickname_cache
+from .component.dispatch import QUICK_COMMANDS
+from .component.scheduler import command_scheduler, serialized
+from .component.probability import format_distribution, format_tier_odds, distribution_cache_info
+
+with startup_profiler.section("JSONLoggerCore()"):
+    logger_core = JSONLoggerCore()
+startup_profiler.stop_imports()
 
 PLUGIN_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_FOLDER = PLUGIN_DIR + "/chara_data/"  # 存储人物卡的文件夹
@@ -48,10 +61,13 @@ log_help_str = '''.log 指令一览：
 
 async def get_sender_nickname(client, group_id, sender_id) :
     # If no group id (private message), or invalid ids, return empty string to allow caller fallback
-    try:
-        if not group_id:
-            return ""
+    if not group_id:
+        return ""
+    # 按 (群, 用户) 缓存，并发的同一用户查询共用一次 get_group_member_info
+    return await nickname_cache.get(group_id, sender_id, lambda: fetch_sender_nickname(client, group_id, sender_id))
 
+async def fetch_sender_nickname(client, group_id, sender_id) :
+    try:
         payloads = {
             "group_id": group_id,
             "user_id": sender_id,
@@ -70,17 +86,93 @@ async def get_sender_nickname(client, group_id, sender_id) :
         logger.info(f"get_sender_nickname failed: {e}")
         return ""
 
+_chara_writer = None
+
+async def chara_writeback_loop():
+    """定时把人物卡缓存中的修改写回磁盘"""
+    while True:
+        await asyncio.sleep(charmod.CHARA_FLUSH_INTERVAL)
+        try:
+            await run_io(charmod.flush_characters)
+        except Exception as e:
+            logger.error(f"flush characters failed: {e}")
+
+_config_watcher = None
+CONFIG_RELOAD_INTERVAL = float(get_setting("config_reload_interval", 5))
+
+async def config_watch_loop():
+    """定时检查 default_config.yaml 的修改时间，有变化时在工作线程中重新载入模板"""
+    while True:
+        await asyncio.sleep(CONFIG_RELOAD_INTERVAL)
+        if not config_changed():
+            continue
+        try:
+            reloaded, problems = await run_io(reload_config)
+        except Exception as e:
+            logger.error(f"reload config failed: {e}")
+            continue
+        if reloaded:
+            logger.info("default_config.yaml reloaded")
+        elif problems:
+            logger.warning("default_config.yaml not reloaded:\n" + "\n".join(problems))
+
+# 启动后在后台预热 Faker（faker_warmup 为逗号分隔的 locale，留空则在首次 .name 时才导入）
+FAKER_WARMUP = [l.strip() for l in str(get_setting("faker_warmup", "") or "").split(",") if l.strip()]
+_faker_warmup = None
+
+async def faker_warmup():
+    try:
+        await run_io(warm_up_faker, FAKER_WARMUP)
+    except Exception as e:
+        logger.warning(f"faker warm-up failed: {e}")
+
 async def init():
-    await logger_core.initialize()
+    global _chara_writer, _config_watcher, _faker_warmup
+    with startup_profiler.section("logger_core.initialize()"):
+        await logger_core.initialize()
+    # 规则表一次性载入内存，之后检定不再访问 SQLite
+    with startup_profiler.section("load_rule_cache()"):
+        await run_io(load_rule_cache)
+    if _chara_writer is None or _chara_writer.done():
+        _chara_writer = asyncio.get_running_loop().create_task(chara_writeback_loop())
+    # config_reload_interval 为 0 时不监视配置文件
+    if CONFIG_RELOAD_INTERVAL > 0 and (_config_watcher is None or _config_watcher.done()):
+        _config_watcher = asyncio.get_running_loop().create_task(config_watch_loop())
+    if FAKER_WARMUP and _faker_warmup is None:
+        _faker_warmup = asyncio.get_running_loop().create_task(faker_warmup())
 
 @register("astrbot_plugin_TRPG", "元.0", "TRPG玩家用骰", "1.0.0")
 class DicePlugin(Star):
     def __init__(self, context: Context):
         #指令前缀，如果消息以这些前缀开头，则会被识别为掷骰指令进行处理，否则会被忽略（但仍会被日志记录）
         self.wakeup_prefix = [".", "。", "/"]
+        # 快速判断：消息首字符不在此集合中即不是指令
+        self._prefix_chars = frozenset(prefix[0] for prefix in self.wakeup_prefix if prefix)
+        # identify_command 计数：rejected 首字符即排除 / unknown 有前缀但不是已知指令 / dispatched 已分发
+        self.dispatch_stats = {"rejected": 0, "unknown": 0, "dispatched": 0}
 
         super().__init__(context)
 
+    async def initialize(self):
+        await init()
+
+    async def terminate(self):
+        global _chara_writer, _config_watcher, _faker_warmup
+        # 插件卸载/停止时把日志缓冲与人物卡缓存全部落盘
+        await logger_core.close()
+        if _chara_writer is not None:
+            _chara_writer.cancel()
+            _chara_writer = None
+        if _config_watcher is not None:
+            _config_watcher.cancel()
+            _config_watcher = None
+        if _faker_warmup is not None:
+            _faker_warmup.cancel()
+            _faker_warmup = None
+        await run_io(charmod.close_store)
+        shutdown_io()
+        get_rule_repository().close()
+
     async def save_log(self, group_id, content) :
         ok, info = await logger_core.add_message(
             group_id=group_id,
@@ -95,9 +187,15 @@ class DicePlugin(Star):
     @filter.command("r")
     async def handle_roll_dice(self, event: AstrMessageEvent, message: str = None, remark : str = None):
         """普通掷骰"""
+        bind_stream(event.get_group_id(), event.get_sender_id())
         
         message = message.strip() if message else None
 
+        if message == "dist":
+            async for result in self.roll_distribution(event, remark):
+                yield result
+            return
+
         user_id = event.get_sender_id()
         group_id = event.get_group_id()
         client = event.bot
@@ -112,9 +210,23 @@ class DicePlugin(Star):
         await self.save_log(group_id = event.get_group_id(), content = result_text)
         yield event.plain_result(result_text)
 
+    async def roll_distribution(self, event: AstrMessageEvent, expr: str = None):
+        """计算掷骰表达式的精确分布（.r dist 表达式）"""
+        expr = expr.strip() if expr else f"1d{dice_mod.DEFAULT_DICE}"
+
+        user_id = event.get_sender_id()
+        group_id = event.get_group_id()
+        ret = await get_sender_nickname(event.bot, group_id, user_id)
+        ret = event.get_sender_name() if ret == "" else ret
+
+        # 大骰池的卷积/DP 可能耗时较长，放到线程池中计算，结果有缓存
+        result_text = await run_io(format_distribution, expr, ret)
+        yield event.plain_result(result_text)
+
     @filter.command("rv")
     async def roll_dice_vampire(self, event: AstrMessageEvent, dice_count: str = "1", difficulty: str = "6"):
         """吸血鬼掷骰"""
+        bind_stream(event.get_group_id(), event.get_sender_id())
         # 验证参数
         try:
             int_dice_count = int(dice_count)
@@ -142,6 +254,7 @@ class DicePlugin(Star):
     @filter.command("rh")
     async def roll_hidden(self, event: AstrMessageEvent, message: str = None):
         """私聊发送掷骰结果"""
+        bind_stream(event.get_group_id(), event.get_sender_id())
         sender_id = event.get_sender_id()
         message = message.strip() if message else f"1d{dice_mod.DEFAULT_DICE}"
 
@@ -170,8 +283,10 @@ class DicePlugin(Star):
 
 
     @filter.command("st")
+    @serialized
     async def status(self, event: AstrMessageEvent, attributes: str = None, exp : str = None):
         """人物卡属性更新，支持掷骰"""
+        bind_stream(event.get_group_id(), event.get_sender_id())
         if not attributes:
             return
 
@@ -180,12 +295,12 @@ class DicePlugin(Star):
         group_id = event.get_group_id()
         charmod.set_active_group(group_id)
         fu_mod.set_active_group(group_id)
-        chara_id = charmod.get_current_character_id(user_id)
+        chara_id = await run_io(charmod.get_current_character_id, user_id)
         if not chara_id:
             yield get_output("pc.show.no_active")
             return
 
-        chara_data = charmod.load_character(user_id, chara_id)
+        chara_data = await run_io(charmod.load_character, user_id, chara_id)
         full_expr = (str(attributes) if attributes else "") + (str(exp) if exp else "")
         attributes_clean = re.sub(r'\s+', '', full_expr)
 
@@ -201,11 +316,13 @@ class DicePlugin(Star):
 
         logger.info(f"{attributes_clean}")
 
-        if attribute not in chara_data["attributes"]:
+        # 人物卡只存规范字段，同义词（如 str / 力量）解析到同一属性
+        key = charmod.canonical_name(attribute)
+        if key not in chara_data["attributes"]:
             yield get_output("pc.show.attr_missing", attribute=attribute)
             return
 
-        current_value = chara_data["attributes"][attribute]
+        current_value = chara_data["attributes"][key]
 
         value_num = 0
         roll_detail = ""
@@ -236,8 +353,8 @@ class DicePlugin(Star):
         else:  # 无运算符，直接赋值
             new_value = value_num
 
-        chara_data["attributes"][attribute] = max(0, new_value)
-        charmod.save_character(user_id, chara_id, chara_data)
+        chara_data["attributes"][key] = max(0, new_value)
+        await run_io(charmod.save_character, user_id, chara_id, chara_data)
 
         response = get_output("pc.update.success", attr=attribute, old=current_value, new=new_value)
         if roll_detail:
@@ -254,6 +371,7 @@ class DicePlugin(Star):
 
     # ----------------- pc create -----------------
     @pc.command("create")
+    @serialized
     async def pc_create_character(self, event, name: Optional[str] = None, attributes: str = ""):
         """创建pc人物卡"""
         user_id = event.get_sender_id()
@@ -262,7 +380,7 @@ class DicePlugin(Star):
         # 设置模块级活动群，确保人物卡/命刻按群隔离存储
         charmod.set_active_group(group_id)
         fu_mod.set_active_group(group_id)
-        characters = charmod.get_all_characters(user_id)
+        characters = await run_io(charmod.get_all_characters, user_id)
 
         if not name:
             name = user_name
@@ -285,14 +403,16 @@ class DicePlugin(Star):
 
         matches = re.findall(r"([\u4e00-\u9fa5a-zA-Z]+)(\d+)", attributes)
         initial_matches = re.findall(r"([\u4e00-\u9fa5a-zA-Z]+)(\d+)", initial_data)
-        attributes_dict = {attr: int(value) for attr, value in initial_matches}
+        attributes_dict = {}
+        for attr, value in initial_matches:
+            attributes_dict.setdefault(charmod.canonical_name(attr), int(value))
         for attr, val in matches:
-            attributes_dict[attr] = int(val)
+            attributes_dict[charmod.canonical_name(attr)] = int(val)
 
-        attributes_dict['max_hp'] = (attributes_dict.get('siz', 0) + attributes_dict.get('con', 0)) // 10
-        attributes_dict['max_san'] = attributes_dict.get('pow', 0)
+        attributes_dict.setdefault(charmod.canonical_name('max_hp'), (charmod.get_attribute(attributes_dict, 'siz') + charmod.get_attribute(attributes_dict, 'con')) // 10)
+        attributes_dict['max_san'] = charmod.get_attribute(attributes_dict, 'pow')
 
-        chara_id = charmod.create_character(user_id, name, attributes_dict)
+        chara_id = await run_io(charmod.create_character, user_id, name, attributes_dict)
         response = get_output("pc.create.success", name=name, id=chara_id)
         
         yield event.plain_result(response)
@@ -307,22 +427,23 @@ class DicePlugin(Star):
         group_id = event.get_group_id()
         charmod.set_active_group(group_id)
         fu_mod.set_active_group(group_id)
-        chara_id = charmod.get_current_character_id(user_id)
+        chara_id = await run_io(charmod.get_current_character_id, user_id)
 
         if not chara_id:
             yield event.plain_result(get_output("pc.show.no_active"))
             return
 
-        chara_data = charmod.load_character(user_id, chara_id)
+        chara_data = await run_io(charmod.load_character, user_id, chara_id)
         if not chara_data:
             yield event.plain_result(get_output("pc.show.load_fail", id=chara_id))
             return
 
         if attribute_name:
-            if attribute_name not in chara_data["attributes"]:
+            key = charmod.canonical_name(attribute_name)
+            if key not in chara_data["attributes"]:
                 yield event.plain_result(get_output("pc.show.attr_missing", attribute=attribute_name))
                 return
-            val = chara_data["attributes"][attribute_name]
+            val = chara_data["attributes"][key]
             yield event.plain_result(get_output("pc.show.attr", attr=attribute_name, value=val))
         else:
             attributes = "\n".join([f"{key}: {value}" for key, value in chara_data["attributes"].items()])
@@ -337,51 +458,55 @@ class DicePlugin(Star):
         group_id = event.get_group_id()
         charmod.set_active_group(group_id)
         fu_mod.set_active_group(group_id)
-        characters = charmod.get_all_characters(user_id)
+        characters = await run_io(charmod.get_all_characters, user_id)
         if not characters:
             yield event.plain_result(get_output("pc.list.empty"))
             return
 
-        current = charmod.get_current_character_id(user_id)
+        current = await run_io(charmod.get_current_character_id, user_id)
         chara_list = "\n".join([f"- {name} (ID: {ch}) {'(当前)' if ch == current else ''}" for name, ch in characters.items()])
         yield event.plain_result(get_output("pc.list.result", list=chara_list))
 
 
     # ----------------- pc change -----------------
     @pc.command("change")
+    @serialized
     async def pc_change_character(self, event, name: str):
         """切换当前使用的人物卡"""
         user_id = event.get_sender_id()
         group_id = event.get_group_id()
         charmod.set_active_group(group_id)
         fu_mod.set_active_group(group_id)
-        characters = charmod.get_all_characters(user_id)
+        characters = await run_io(charmod.get_all_characters, user_id)
         if name not in characters:
             yield event.plain_result(get_output("pc.change,missing", name=name))
             return
 
-        charmod.set_current_character(user_id, characters[name])
+        await run_io(charmod.set_current_character, user_id, characters[name])
         yield event.plain_result(get_output("pc.change.success", name=name))
 
 
     # ----------------- pc update -----------------
     @pc.command("update")
+    @serialized
     async def pc_update_character(self, event, attribute: str, value: str):
         """更新当前人物卡的属性值，支持直接赋值或使用 + - * 运算符进行修改，value 支持掷骰表达式（如 2d6）"""
+        bind_stream(event.get_group_id(), event.get_sender_id())
         user_id = event.get_sender_id()
         group_id = event.get_group_id()
         charmod.set_active_group(group_id)
         fu_mod.set_active_group(group_id)
-        chara_id = charmod.get_current_character_id(user_id)
+        chara_id = await run_io(charmod.get_current_character_id, user_id)
         if not chara_id:
             yield event.plain_result(get_output("pc.update.no_active"))
             return
 
-        chara_data = charmod.load_character(user_id, chara_id)
-        if attribute not in chara_data["attributes"]:
-            chara_data["attributes"][attribute] = 0
+        chara_data = await run_io(charmod.load_character, user_id, chara_id)
+        key = charmod.canonical_name(attribute)
+        if key not in chara_data["attributes"]:
+            chara_data["attributes"][key] = 0
 
-        current_value = chara_data["attributes"][attribute]
+        current_value = chara_data["attributes"][key]
         match = re.match(r"([+\-*]?)(\d*)d?(\d*)", value)
         if not match:
             yield event.plain_result(get_output("pc.update.error_format"))
@@ -392,7 +517,8 @@ class DicePlugin(Star):
         dice_faces = int(match.group(3)) if match.group(3) else 0
 
         if dice_faces > 0:
-            rolls = [random.randint(1, dice_faces) for _ in range(dice_count)]
+            rng = get_random()
+            rolls = [rng.randint(1, dice_faces) for _ in range(dice_count)]
             value_num = sum(rolls)
             roll_detail = f"掷骰结果: [{' + '.join(map(str, rolls))}] = {value_num}"
         else:
@@ -408,8 +534,8 @@ class DicePlugin(Star):
         else:
             new_value = value_num
 
-        chara_data["attributes"][attribute] = max(0, new_value)
-        charmod.save_character(user_id, chara_id, chara_data)
+        chara_data["attributes"][key] = max(0, new_value)
+        await run_io(charmod.save_character, user_id, chara_id, chara_data)
 
         text = get_output("pc.update.success", attr=attribute, old=current_value, new=new_value)
         if roll_detail:
@@ -420,13 +546,14 @@ class DicePlugin(Star):
 
     # ----------------- pc delete -----------------
     @pc.command("delete")
+    @serialized
     async def pc_delete_character(self, event, name: str):
         """删除指定的人物卡"""
         user_id = event.get_sender_id()
         group_id = event.get_group_id()
         charmod.set_active_group(group_id)
         fu_mod.set_active_group(group_id)
-        success, _ = charmod.delete_character(user_id, name)
+        success, _ = await run_io(charmod.delete_character, user_id, name)
         if not success:
             yield event.plain_result(get_output("pc.delete.fail", name=name))
             return
@@ -450,21 +577,23 @@ class DicePlugin(Star):
         charmod.set_active_group(group_id)
         fu_mod.set_active_group(group_id)
 
-        chara_id = charmod.get_current_character_id(user_id)
-        chara_data = charmod.load_character(user_id, chara_id)
+        chara_id = await run_io(charmod.get_current_character_id, user_id)
+        chara_data = await run_io(charmod.load_character, user_id, chara_id)
         if not chara_data:
             yield event.plain_result(get_output("nick.no_character", id=chara_id))
             return
 
-        max_hp = (chara_data['attributes'].get('con', 0) + chara_data['attributes'].get('siz', 0)) // 10
+        attrs = chara_data['attributes']
+        max_hp = (charmod.get_attribute(attrs, 'con') + charmod.get_attribute(attrs, 'siz')) // 10
         name = chara_data['name']
-        hp = chara_data['attributes'].get('hp', 0)
-        san = chara_data['attributes'].get('san', 0)
-        dex = chara_data['attributes'].get('dex', 0)
+        hp = charmod.get_attribute(attrs, 'hp')
+        san = charmod.get_attribute(attrs, 'san')
+        dex = charmod.get_attribute(attrs, 'dex')
         new_card = f"{name} HP:{hp}/{max_hp} SAN:{san} DEX:{dex}"
 
         payloads = {"group_id": group_id, "user_id": user_id, "card": new_card}
         await client.api.call_action("set_group_card", **payloads)
+        nickname_cache.put(group_id, user_id, new_card)
 
         yield event.plain_result(get_output("nick.success"))
 
@@ -473,6 +602,12 @@ class DicePlugin(Star):
     @filter.command("ra")
     async def roll_attribute(self, event: AstrMessageEvent, skill_name: str, skill_value: str = None):
         """技能骰"""
+        bind_stream(event.get_group_id(), event.get_sender_id())
+        if skill_name.startswith("odds"):
+            async for result in self.roll_odds(event, skill_name[4:], skill_value):
+                yield result
+            return
+
         user_id = event.get_sender_id()
         group_id = event.get_group_id()
         name = event.get_sender_name()
@@ -482,7 +617,7 @@ class DicePlugin(Star):
         fu_mod.set_active_group(group_id)
 
         if skill_value is None:
-            skill_value = charmod.get_skill_value(user_id, skill_name)
+            skill_value = await run_io(charmod.get_skill_value, user_id, skill_name)
 
         client = event.bot
         ret = await get_sender_nickname(client, group_id, user_id)
@@ -496,10 +631,30 @@ class DicePlugin(Star):
         await self.save_log(group_id = event.get_group_id(), content = result_message)
         yield event.plain_result(result_message)
 
+    async def roll_odds(self, event: AstrMessageEvent, skill_name: str = "", skill_value: str = None):
+        """COC 检定各等级概率（.ra odds 技能名/技能值）"""
+        user_id = event.get_sender_id()
+        group_id = event.get_group_id()
+
+        charmod.set_active_group(group_id)
+
+        # .ra odds 侦查：技能名落在 skill_value 上
+        if not skill_name and skill_value is not None and not str(skill_value).isdigit():
+            skill_name, skill_value = skill_value, None
+
+        if skill_value is None:
+            skill_value = await run_io(charmod.get_skill_value, user_id, skill_name) if skill_name else None
+
+        ret = await get_sender_nickname(event.bot, group_id, user_id)
+        ret = event.get_sender_name() if ret == "" else ret
+        result_message = format_tier_odds(skill_name or "技能", skill_value, str(group_id), ret)
+        yield event.plain_result(result_message)
+
     # 惩罚骰技能判定
     @filter.command("rap")
     async def roll_attribute_penalty(self, event: AstrMessageEvent, dice_count: str = "1", skill_name: str = "", skill_value: str = None):
         """惩罚骰技能判定"""
+        bind_stream(event.get_group_id(), event.get_sender_id())
         user_id = event.get_sender_id()
         group_id = event.get_group_id()
 
@@ -508,7 +663,7 @@ class DicePlugin(Star):
         fu_mod.set_active_group(group_id)
 
         if skill_value is None:
-            skill_value = charmod.get_skill_value(user_id, skill_name)
+            skill_value = await run_io(charmod.get_skill_value, user_id, skill_name)
 
         client = event.bot
         ret = await get_sender_nickname(client, group_id, user_id)
@@ -522,6 +677,7 @@ class DicePlugin(Star):
     @filter.command("rab")
     async def roll_attribute_bonus(self, event: AstrMessageEvent, dice_count: str = "1", skill_name: str = "", skill_value: str = None):
         """奖励骰技能判定"""
+        bind_stream(event.get_group_id(), event.get_sender_id())
         user_id = event.get_sender_id()
         group_id = event.get_group_id()
 
@@ -530,7 +686,7 @@ class DicePlugin(Star):
         fu_mod.set_active_group(group_id)
 
         if skill_value is None:
-            skill_value = charmod.get_skill_value(user_id, skill_name)
+            skill_value = await run_io(charmod.get_skill_value, user_id, skill_name)
 
         client = event.bot
         ret = await get_sender_nickname(client, group_id, user_id)
@@ -544,11 +700,12 @@ class DicePlugin(Star):
     @filter.command("rad")
     async def roll_attribute_random(self, event: AstrMessageEvent, skill_name: str, skill_value: str = None):
         """随机值技能判定"""
+        bind_stream(event.get_group_id(), event.get_sender_id())
         user_id = event.get_sender_id()
         group_id = event.get_group_id()
 
         if skill_value is None:
-            skill_value = random.randint(1, 100)
+            skill_value = get_random().randint(1, 100)
 
         client = event.bot
         ret = await get_sender_nickname(client, group_id, user_id)
@@ -559,11 +716,13 @@ class DicePlugin(Star):
         yield event.plain_result(result_message)
         
     @filter.command("en")
+    @serialized
     async def pc_grow_up(self, event: AstrMessageEvent, skill_name: str, skill_value: str = None):
         """
         .en 技能成长判定
         调用 character 模块的 grow_up 生成结果文本，再通过 event 发送给用户。
         """
+        bind_stream(event.get_group_id(), event.get_sender_id())
         user_id = event.get_sender_id()
         group_id = event.get_group_id()
         # 设置模块级活动群，确保按群隔离
@@ -571,7 +730,8 @@ class DicePlugin(Star):
         fu_mod.set_active_group(group_id)
 
         # 调用 character.py 中同步逻辑函数，不传入额外函数引用
-        result_str = charmod.grow_up(
+        result_str = await run_io(
+            charmod.grow_up,
             user_id,
             skill_name=skill_name,
             skill_value=skill_value
@@ -614,13 +774,15 @@ class DicePlugin(Star):
     # ========================================================= #
     # san check
     @filter.command("sc")
+    @serialized
     async def pc_san_check(self, event: AstrMessageEvent, loss_formula: str):
         """理智检定"""
+        bind_stream(event.get_group_id(), event.get_sender_id())
         user_id = event.get_sender_id()
         group_id = event.get_group_id()
         charmod.set_active_group(group_id)
         fu_mod.set_active_group(group_id)
-        chara_data = charmod.get_current_character(user_id)
+        chara_data = await run_io(charmod.get_current_character, user_id)
         client = event.bot
         
         if not chara_data:
@@ -631,7 +793,7 @@ class DicePlugin(Star):
 
         # 更新人物卡
         chara_data["attributes"]["san"] = new_san
-        charmod.save_character(user_id, chara_data["id"], chara_data)
+        await run_io(charmod.save_character, user_id, chara_data["id"], chara_data)
 
         if new_san == 0 :
             text = get_output(
@@ -691,7 +853,9 @@ class DicePlugin(Star):
     @filter.command("ti")
     async def pc_temporary_insanity(self, event: AstrMessageEvent):
         """临时疯狂"""
-        result = sanity.get_temporary_insanity(sanity.phobias, sanity.manias)
+        bind_stream(event.get_group_id(), event.get_sender_id())
+        # 首次使用时读入症状表，放到 I/O 线程中
+        result = await run_io(sanity.get_temporary_insanity)
         text = get_output("san.temporary_insanity", result=result)
         await self.save_log(group_id = event.get_group_id(), content = text)
         yield event.plain_result(text)
@@ -699,7 +863,9 @@ class DicePlugin(Star):
     @filter.command("li")
     async def pc_long_term_insanity(self, event: AstrMessageEvent):
         """长期疯狂"""
-        result = sanity.get_long_term_insanity(sanity.phobias, sanity.manias)
+        bind_stream(event.get_group_id(), event.get_sender_id())
+        # 首次使用时读入症状表，放到 I/O 线程中
+        result = await run_io(sanity.get_long_term_insanity)
         text = get_output("san.long_term_insanity", result=result)
         await self.save_log(group_id = event.get_group_id(), content = text)
         yield event.plain_result(text)
@@ -787,20 +953,21 @@ class DicePlugin(Star):
     @filter.command("ri")
     async def roll_initiative(self , event: AstrMessageEvent, expr: str = None):
         """以调整值投掷先攻"""
+        bind_stream(event.get_group_id(), event.get_sender_id())
         group_id = event.get_group_id()
         user_id = event.get_sender_id()
         user_name = event.get_sender_name()
 
         if not expr:
-            init_value = random.randint(1, 20)
+            init_value = get_random().randint(1, 20)
             player_name = user_name
         elif expr[0] == "+":
             match = re.match(r"\+(\d+)", expr)
-            init_value = random.randint(1, 20) + int(match.group(1))
+            init_value = get_random().randint(1, 20) + int(match.group(1))
             player_name = user_name
         elif expr[0] == "-":
             match = re.match(r"\-(\d+)", expr)
-            init_value = random.randint(1, 20) - int(match.group(1))
+            init_value = get_random().randint(1, 20) - int(match.group(1))
             player_name = user_name
         else:
             match = re.match(r"(\d+)", expr)
@@ -833,13 +1000,15 @@ class DicePlugin(Star):
     @filter.command("name")
     async def generate_name(self, event: AstrMessageEvent, language: str = "cn", num: int = 5, sex: str = None):
         """随机生成一些名字"""
-        names = generate_names(language=language, num=num, sex=sex)
+        # 首次使用某个语言时会导入 faker 并构造实例，放到 I/O 线程中
+        names = await run_io(generate_names, language=language, num=num, sex=sex)
         yield event.plain_result(get_output("generated_names", num = num, names=", ".join(names)))
 
     # ------------------ CoC角色生成 ------------------ #
     @filter.command("coc")
     async def generate_coc_character(self, event: AstrMessageEvent, x: int = 1):
         """coc角色生成"""
+        bind_stream(event.get_group_id(), event.get_sender_id())
         characters = [roll_character() for _ in range(x)]
         results = []
         for i, char in enumerate(characters):
@@ -850,6 +1019,7 @@ class DicePlugin(Star):
     @filter.command("dnd")
     async def generate_dnd_character(self, event: AstrMessageEvent, x: int = 1):
         """dnd角色生成"""
+        bind_stream(event.get_group_id(), event.get_sender_id())
         characters = [roll_dnd_character() for _ in range(x)]
         results = []
         for i, char in enumerate(characters):
@@ -866,6 +1036,7 @@ class DicePlugin(Star):
     async def fu_check_command(self, event: AstrMessageEvent, attr1: str = "", attr2: str = "", difficulty: str = "6"):
         """FU 掷骰检定：.fu check <属性1> <属性2> <难度>
         属性可以是属性名（会从当前人物卡读取）或直接填数值（表示该属性的数值/骰面）。"""
+        bind_stream(event.get_group_id(), event.get_sender_id())
         user_id = event.get_sender_id()
         group_id = event.get_group_id()
         client = event.bot
@@ -877,7 +1048,7 @@ class DicePlugin(Star):
         fu_mod.set_active_group(group_id)
         charmod.set_active_group(group_id)
         # 调用 fu 模块进行检定（传入 user_id 以便从人物卡读取属性值）
-        result_text = fu_mod.fu_check(attr1=attr1, attr2=attr2, difficulty=difficulty, user_id=user_id, name=ret)
+        result_text = await run_io(fu_mod.fu_check, attr1=attr1, attr2=attr2, difficulty=difficulty, user_id=user_id, name=ret)
 
         await self.save_log(group_id=event.get_group_id(), content=result_text)
         yield event.plain_result(result_text)
@@ -895,7 +1066,7 @@ class DicePlugin(Star):
         # 设置模块级活动群，确保命刻按群隔离
         fu_mod.set_active_group(group_id)
         charmod.set_active_group(group_id)
-        text = fu_mod.create_mark(name, length)
+        text = fu_mod.create_mark(name, length, group_id=group_id)
         await self.save_log(group_id=group_id, content=text)
         yield event.plain_result(text)
 
@@ -906,7 +1077,7 @@ class DicePlugin(Star):
         group_id = event.get_group_id()
         fu_mod.set_active_group(group_id)
         charmod.set_active_group(group_id)
-        text = fu_mod.show_marks(identifier)
+        text = fu_mod.show_marks(identifier, group_id=group_id)
         await self.save_log(group_id=group_id, content=text)
         yield event.plain_result(text)
 
@@ -917,7 +1088,7 @@ class DicePlugin(Star):
         group_id = event.get_group_id()
         fu_mod.set_active_group(group_id)
         charmod.set_active_group(group_id)
-        text = fu_mod.advance_mark(identifier, value)
+        text = fu_mod.advance_mark(identifier, value, group_id=group_id)
         await self.save_log(group_id=group_id, content=text)
         yield event.plain_result(text)
 
@@ -928,7 +1099,7 @@ class DicePlugin(Star):
         group_id = event.get_group_id()
         fu_mod.set_active_group(group_id)
         charmod.set_active_group(group_id)
-        text = fu_mod.delete_mark(target)
+        text = fu_mod.delete_mark(target, group_id=group_id)
         await self.save_log(group_id=group_id, content=text)
         yield event.plain_result(text)
         
@@ -1022,7 +1193,9 @@ class DicePlugin(Star):
             "基础掷骰\n"
             "r 1d100 - 掷 1 个 100 面骰\n"
             "r 3d6+2d4-1d8 - 掷 3 个 6 面骰 + 2 个 4 面骰 - 1 个 8 面骰\n"
-            "r 3#1d20 - 掷 1d20 骰 3 次\n\n"
+            "r 3#1d20 - 掷 1d20 骰 3 次\n"
+            "r (2d6+6)*5 - 支持 + - * / 四则运算与括号（除法向下取整）\n"
+            "r dist 4d6k3 - 计算表达式的精确概率分布\n\n"
             
             "人物卡管理\n"
             "pc create 名称 属性值 - 创建人物卡\n"
@@ -1037,6 +1210,7 @@ class DicePlugin(Star):
             "ra 技能名 - 进行技能骰\n"
             "rap n 技能名 - 带 n 个惩罚骰的技能骰\n"
             "rab n 技能名 - 带 n 个奖励骰的技能骰\n"
+            "ra odds 技能名/技能值 - 查看各规则下的检定成功概率\n"
             "sc 1d6/1d10 - 进行 San Check\n"
             "ti - 生成临时疯狂症状\n"
             "li - 生成长期疯狂症状\n"
@@ -1091,6 +1265,7 @@ class DicePlugin(Star):
     @filter.command("fireball")
     async def fireball_cmd(self, event: AstrMessageEvent, ring: int = 3):
         """施放火球术，计算伤害"""
+        bind_stream(event.get_group_id(), event.get_sender_id())
         result = dice_mod.fireball(ring)
         yield event.plain_result(result)
 
@@ -1105,15 +1280,48 @@ class DicePlugin(Star):
     async def setcoc_cmd(self, event: AstrMessageEvent, command: str = " "):
         """设置coc规则"""
         group_id = event.get_group_id()
-        result = modify_coc_great_sf_rule_command(group_id, command)
+        result = await run_io(modify_coc_great_sf_rule_command, group_id, command)
         yield event.plain_result(result)
 
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("dicestat")
+    async def dicestat_cmd(self, event: AstrMessageEvent):
+        """查看插件运行指标（管理员）"""
+        io = io_stats()
+        expr_cache = compile_cache_info()
+        dist_cache = distribution_cache_info()
+        nick = nickname_cache.stats()
+        chara = charmod.character_cache_stats()
+        sched = command_scheduler.stats()
+        lines = [
+            f"I/O 线程池：{io['workers']} 线程，进行中 {io['in_flight']}，排队 {io['queued']}",
+            f"表达式缓存：{expr_cache.currsize}/{expr_cache.maxsize}，命中 {expr_cache.hits}，未命中 {expr_cache.misses}",
+            f"分布缓存：{dist_cache.currsize}/{dist_cache.maxsize}，命中 {dist_cache.hits}，未命中 {dist_cache.misses}",
+            f"随机数流：{stream_count()} 个",
+            f"人物卡缓存：{chara['size']}/{chara['maxsize']}，待写回 {chara['dirty']}",
+            f"指令调度：执行中 {sched['running']}/{sched['max_concurrency']}，排队 {sched['waiting']}（峰值 {sched['peak_waiting']}），"
+            f"活跃用户队列 {sched['queues']}，最长 {sched['longest_queue']}（峰值 {sched['peak_queue']}），已完成 {sched['completed']}",
+            f"快捷指令：直接排除 {self.dispatch_stats['rejected']}，未识别 {self.dispatch_stats['unknown']}，已分发 {self.dispatch_stats['dispatched']}",
+            f"昵称缓存：{nick['size']}/{nick['maxsize']}，命中 {nick['hits']}，未命中 {nick['misses']}，合并请求 {nick['coalesced']}",
+        ]
+        yield event.plain_result("\n".join(lines))
+
     
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("dicestartup")
+    async def dicestartup_cmd(self, event: AstrMessageEvent):
+        """查看插件启动耗时报告（管理员，需设置 TRPGDICE_PROFILE_STARTUP=1 启动）"""
+        yield event.plain_result(startup_profiler.report())
+
     # 识别所有信息，有别于指令的识别模式，识别用户输入的消息中是否包含掷骰前缀，并进行相应处理
     @event_message_type(EventMessageType.GROUP_MESSAGE)
     async def identify_command(self, event: AstrMessageEvent):
 
         message = event.message_obj.message_str
+
+        # 群名片变更通知：更新昵称缓存，不作为聊天消息处理
+        if nickname_cache.handle_notice(getattr(event.message_obj, "raw_message", None)):
+            return
         
         # ------------------- 日志收集逻辑 -------------------
         group_id = event.message_obj.group_id
@@ -1124,8 +1332,8 @@ class DicePlugin(Star):
             timestamp = int(event.message_obj.timestamp)
             components = getattr(event.message_obj, "message", [])
 
-            # 调用功能性模块添加消息
-            await logger_core.add_message(
+            # 交给日志模块缓冲，不等待；落盘由后台任务完成
+            logger_core.submit_message(
                 group_id=group_id,
                 user_id=user_id,
                 nickname=nickname,
@@ -1134,312 +1342,34 @@ class DicePlugin(Star):
                 components=components
             )
         # ----------------------------------------------------
-        
-        # yield event.plain_result(message)
-
-        random.seed(int(time.time() * 1000))
 
         """监听用户是否输入含掷骰前缀的指令，实现快捷掷骰"""
-        #如果没有消息以掷骰前缀开头，则不进行后续的掷骰识别处理
-        if not any(message.startswith(prefix) for prefix in self.wakeup_prefix):
+        #如果消息不以掷骰前缀开头，只做一次首字符集合查询即返回
+        if not message or message[0] not in self._prefix_chars:
+            self.dispatch_stats["rejected"] += 1
             return
 
-        # 保留原始尾部文本（保留空格），同时准备一个去除所有空白的紧凑版本用于命令识别
-        raw = message[1:]
-
-        compact = re.sub(r'\s+', '', raw)
-
-        m = re.match(r'^([a-z]+)', compact, re.I)
-
-        if not m:
+        # 在前缀树上走一遍指令名，只运行匹配到的指令的参数解析器（见 component/dispatch.py）
+        command, rest = QUICK_COMMANDS.match(message[1:])
+        args = command.parser(rest) if command is not None else None
+        if args is None:
+            self.dispatch_stats["unknown"] += 1
             return
+        self.dispatch_stats["dispatched"] += 1
 
-        # cmd 是小写的命令部分
-        cmd = m.group(1).lower()
-        # expr/remark 初始值；后续分支会根据命令从 raw/compact 中提取更合理的值
-        # expr 默认是紧凑串去掉命令部分后的剩余文本，remark 默认是 None，后续根据不同命令的特点进行调整
-        expr = compact[m.end():].strip()
-        remark = None
-        
-        skill_value = ""
-        dice_count = "1"
-
-        if cmd[0:2] == "pc":
-            # 提取"pc"后的子串，识别子命令（如 create、show、list、change、update、delete）
-            expr = compact[2:].strip()  # expr 从 pc 后的文本开始
-            if expr[0:6] == "create":
-                sub_cmd = "create"
-                expr = expr[len(sub_cmd):].strip()
-            elif expr[0:4] == "show":
-                sub_cmd = "show"
-                expr = expr[len(sub_cmd):].strip()
-            elif expr[0:4] == "list":
-                sub_cmd = "list"
-                expr = None  # pc list 没有额外参数，expr 设为 None
-            elif expr[0:6] == "change":
-                sub_cmd = "change"
-                expr = expr[len(sub_cmd):].strip()
-            elif expr[0:6] == "update":
-                sub_cmd = "update"
-                expr = expr[len(sub_cmd):].strip()
-                attr_value_match = re.search(r'([0-9]*)$', expr)  # 尝试提取属性值（如果提供了纯数字作为属性值）
-                if attr_value_match:
-                    attr_value = attr_value_match.group(1)
-                    attr_name = expr[:attr_value_match.start()]  # 属性名是属性值前的部分
-                else:
-                    attr_value = ""  # 如果没有提供属性值，则设置为空字符串
-                    attr_name = expr  # 属性名是整个 expr
-            elif expr[0:6] == "delete":
-                sub_cmd = "delete"
-                expr = expr[len(sub_cmd):].strip()
-        
-        if cmd[0:3] == "coc":
-            # 提取"coc"后的子串，识别子命令（如 x）
-            expr = compact[3:].strip()  # expr 从 coc 后的文本开始
-            if expr.isdigit():
-                sub_cmd = "generate"
-                expr = int(expr)  # 将 x 转换为整数
-            else:
-                sub_cmd = None  # 如果没有提供数字参数，则 sub_cmd 设为 None
-        
-        if cmd[0:3] == "dnd":
-            # 提取"dnd"后的子串，识别子命令（如 x）
-            expr = compact[3:].strip()  # expr 从 dnd 后的文本开始
-            if expr.isdigit():
-                sub_cmd = "generate"
-                expr = int(expr)  # 将 x 转换为整数
-            else:
-                sub_cmd = None  # 如果没有提供数字参数，则 sub_cmd 设为 None
-        
-        if cmd[0:7] == "fucheck":
-            # 提取"check"后的子串（假设raw以"fucheck"开头，如"fucheck check a b c"）
-            check_pos = raw.find("check") + len("check")  # 找到"check"的结束位置
-            params = raw[check_pos:].strip().split()      # 分割为参数列表
-    
-            # 按顺序赋值（需确保参数数量足够，可添加异常处理）
-            attr1 = params[0] if len(params) > 0 else ""
-            attr2 = params[1] if len(params) > 1 else ""
-            difficulty = params[2] if len(params) > 2 else None
-    
-            cmd = "fu check"
-
-        if cmd[0:6] == "fumark":
-            # 提取"mark"后的子串（如 "fu mark create 名称 长度"）
-            mark_pos = raw.find("mark") + len("mark")  # 找到"mark"的结束位置
-            expr = raw[mark_pos:].strip()  # expr 从 mark 后的文本开始
-            if expr[0:6] == "create" or expr[0:3] == "add" or expr[0:3] == "new":
-                sub_cmd = "create"
-                params = expr.strip().split()  # 从原始字符串中分割参数，保留空格以正确识别名称等参数
-                name = params[1] if len(params) > 1 else ""
-                length = params[2] if len(params) > 2 else ""
-            if expr[0:4] == "show" or expr[0:4] == "list":
-                sub_cmd = "show"
-                params = expr.strip().split()  # 从原始字符串中分割参数，保留空格以正确识别名称等参数
-                identifier = params[1] if len(params) > 1 else None
-            if expr[0:7] == "advance" or expr[0:3] == "adv" or expr[0:4] == "push" or expr[0:3] == "inc":
-                sub_cmd = "advance"
-                params = expr.strip().split()  # expr 从 advance 后的文本开始，分割为标识符和数值两部分
-                identifier = params[1] if len(params) > 1 else ""
-                value = params[2] if len(params) > 2 else ""
-            if expr[0:6] == "delete" or expr[0:3] == "del" or expr[0:6] == "remove" or expr[0:2] == "rm":
-                sub_cmd = "delete"
-                params = expr.strip().split()
-                target = params[1] if len(params) > 1 else ""
-            cmd = "fu mark"
-
-        if cmd[0:2] == "st":
-            sv_match = re.search(r'(([0-9]*[dD]*[0-9]+(?:[+-][0-9]*[dD][0-9]+)*)+)$', compact) # 检索紧凑串中是否有骰子表达式，支持属性成长中直接掷骰子确定成长值
-            if sv_match:
-                skill_value = sv_match.group(1)
-                expr = compact[2:len(compact)-len(skill_value)]
-                cmd = "st"
-            else:
-                skill_value = None
-                expr = compact[2:]
-                cmd = "st"
-
-        if cmd[0:2] == "en":
-            sv_match = re.search(r'(([0-9]*[dD]*[0-9]+(?:[+-][0-9]*[dD][0-9]+)*)+)$', compact) # 检索紧凑串中是否有骰子表达式，支持技能成长中直接掷骰子确定成长值
-            if sv_match:
-                skill_value = sv_match.group(1)
-                expr = compact[2:len(compact)-len(skill_value)]
-                cmd = "en"
-            else:
-                skill_value = None
-                expr = compact[2:]
-                cmd = "en"
-            
-        if cmd[0:4] == "name":
-            # 提取"name"后的子串，识别参数（如语言、数量、性别）
-            expr = compact[4:].strip()  # expr 从 name 后的文本开始
-            parts = expr.split()
-            lan = parts[0] if len(parts) > 0 else "cn"
-            n = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 5
-            sex = parts[2] if len(parts) > 2 else None
-            cmd = "name"
-
-        if cmd[0:2] == "ra":
-            sv_match = re.search(r'(([0-9]*[dD]*[0-9]+(?:[+-][0-9]*[dD][0-9]+)*)+)$', compact)
-            if sv_match:
-                skill_value = sv_match.group(1)
-                expr = compact[2:len(compact)-len(skill_value)]
-                cmd = "ra"
-            else:
-                skill_value = None
-                expr = compact[2:]
-                cmd = "ra"
-
-            # 支持 b/p 紧接在 ra 后面，使用紧凑串检查
-            if expr and (expr[0] == 'b' or expr[0] == 'p') :
-                cmd = cmd + expr[0]
-                expr = expr[1:]
-                dice_count_match = re.search(r'([0-9]+)', expr)
-                if dice_count_match:
-                    dice_count = dice_count_match.group()
-                    expr = expr[dice_count_match.end():]
-                else:
-                    dice_count = "1"
-            
-            elif expr and (expr[0] == 'd' or expr[0] == 'D') :
-                    cmd = cmd + 'd'
-                    expr = expr[1:]
-                    sv_match = re.search(r'(([0-9]*[dD]*[0-9]+(?:[+-][0-9]*[dD][0-9]+)*)+)$', compact)
-                    if sv_match:
-                        skill_value = sv_match.group(1)
-                        expr = compact[3:len(compact)-len(skill_value)]
-                    else:
-                        skill_value = random.randint(1,100) # 如果没有明确的技能值，默认使用 1d100 的随机结果作为技能值
-                        expr = compact[3:]
-
-            if expr.isdigit():
-                skill_value = expr
-                
-            if not expr and skill_value:
-                expr = skill_value
-                
-        elif cmd[0:2] == "rd":
-            raw_rd = raw[2:].strip()
-            dice_match = re.search(r'([0-9]*[#]*[0-9]*[dD]*[0-9]+(?:[+-][0-9]*[dD][0-9]+)*)', raw_rd)
+        # 掷骰使用本群独立的随机数流（首次使用时由 os.urandom 播种），不再逐条消息重设全局种子
+        bind_stream(group_id, event.get_sender_id())
 
-            if dice_match:
-                dice_size = dice_match.group(1)
-                expr = f"1d{dice_size}"
-                remark = dice_match.group(0).strip()
-                cmd = "rd"
-            else:
-                expr = "1d100"
-                remark = raw_rd.strip()
-                cmd = "rd"
-        
-        elif cmd[0:2] == "rh":
-            expr = "1d100"
-            remark = raw[2:].strip()
-            cmd = "rh"
-
-        elif cmd[0] == "r":
-            # 在原始尾部中查找骰子表达式，无论用户是否在表达式前后加空格
-            dice_match = re.search(r'([0-9]*[#]*[0-9]*[dD]*[0-9]+(?:[+-][0-9]*[dD][0-9]+)*)', raw)
-            
-            if dice_match:
-                expr = dice_match.group(1)
-                # 备注为骰子内容
-                remark = dice_match.group(0).strip()
-                cmd = "r"
+        # 同一用户的指令按顺序执行，不同群/用户并行（见 component/scheduler.py）
+        async with command_scheduler.slot(group_id, event.get_sender_id()):
+            handler = getattr(self, command.handler)(event, *args)
+            if inspect.isasyncgen(handler):
+                async for result in handler:
+                    yield result
             else:
-                expr = "1d100"
-                remark = None
-                cmd = "r"
-                
-        # result_message = (f"m={m},message={message},cmd={cmd},expr={expr}.")
-        # yield event.plain_result(result_message)
+                # pc_grow_up 等直接调用平台 API 发送结果的处理方法
+                await handler
 
-        if cmd == "r":
-            async for result in self.handle_roll_dice(event, expr, remark):
-                yield result
-        elif cmd == "rd":
-            async for result in self.handle_roll_dice(event, expr, remark):
-                yield result
-        elif cmd == "rh":
-            async for result in self.roll_hidden(event) :
-                yield result
-        elif cmd == "rab":
-            async for result in self.roll_attribute_bonus(event, dice_count, expr, skill_value):
-                yield result
-        elif cmd == "rap":
-            async for result in self.roll_attribute_penalty(event, dice_count, expr, skill_value):
-                yield result
-        elif cmd == "rad":
-            async for result in self.roll_attribute(event, expr, skill_value):
-                yield result
-        elif cmd == "ra":
-            async for result in self.roll_attribute(event, expr, skill_value):
-                yield result
-        elif cmd == "en":
-            await self.pc_grow_up(event, expr, skill_value)
-        elif cmd == "st":
-            await self.pc_grow_up(event, expr, skill_value, is_skill=False)
-        elif cmd == "sc":
-            async for result in self.pc_san_check(event, expr) :
-                yield result
-        elif cmd == "li":
-            async for result in self.pc_long_term_insanity(event):
-                yield result
-        elif cmd == "ti":
-            async for result in self.pc_temporary_insanity(event):
-                yield result
-        elif cmd == "ri":
-            async for result in self.roll_initiative(event, expr):
-                yield result
-        elif cmd == "sn":
-            await self.filter_set_nickname(event, expr)
-        elif cmd == "coc":
-            async for result in self.generate_coc_character(event, int(expr) if expr.isdigit() else 1):
-                yield result
-        elif cmd == "dnd":
-            async for result in self.generate_dnd_character(event, int(expr) if expr.isdigit() else 1):
-                yield result
-        elif cmd == "fu check":
-            async for result in self.fu_check_command(event, attr1, attr2, difficulty):
-                yield result
-        elif cmd == "fu mark":
-            if sub_cmd == "create":
-                async for result in self.fu_create_command(event, name, length):
-                    yield result
-            elif sub_cmd == "show":
-                async for result in self.fu_show_command(event, identifier):
-                    yield result
-            elif sub_cmd == "advance":
-                async for result in self.fu_advance_command(event, identifier, value):
-                    yield result
-            elif sub_cmd == "delete":
-                async for result in self.fu_delete_command(event, target):
-                    yield result
-        elif cmd == "jrrp":
-            async for result in self.roll_RP_cmd(event):
-                yield result
-        elif cmd[0:4] == "name":
-            async for result in self.generate_name(event, language=lan, num=n):
-                yield result
-        elif cmd[0:2] == "pc":
-            if sub_cmd == "create":
-                async for result in self.pc_create_character(event, expr):
-                    yield result
-            elif sub_cmd == "show":
-                async for result in self.pc_show_character(event):
-                    yield result
-            elif sub_cmd == "list":
-                async for result in self.pc_list_characters(event):
-                    yield result
-            elif sub_cmd == "change":
-                async for result in self.pc_change_character(event, expr):
-                    yield result
-            elif sub_cmd == "update":
-                async for result in self.pc_update_character(event, attr_name, attr_value):
-                    yield result
-            elif sub_cmd == "delete":
-                async for result in self.pc_delete_character(event):
-                    yield result
-                
     # # log save
     # @command_group("log")
     # async def log(self, event: AstrMessageEvent, command: str = None):
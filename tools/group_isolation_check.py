@@ -0,0 +1,81 @@
+import os
+import sys
+import shutil
+import asyncio
+import argparse
+import tempfile
+
+from component import character as charmod
+from component import fu
+from component.chara_store import open_store
+from component.io_pool import run_io, shutdown_io
+
+# 群隔离压力检查：N 个群的处理协程交错执行 建卡 / 读卡 / 命刻 循环，全部经由 run_io 派发到 I/O 线程池，
+# 每一步之间主动让出事件循环。同一用户在各群都有人物卡，任何一个群读到别的群的人物卡或命刻即为失败。
+# 人物卡写入临时目录（或临时 SQLite 文件），不触碰插件的 chara_data。
+# 在插件根目录执行：
+#   python -m tools.group_isolation_check --groups 32 --rounds 20
+# 没有串群时退出码为 0，否则为 1。
+
+USER_ID = "isolation-check-user"
+
+
+async def _group_worker(group_id: str, rounds: int, problems: list):
+    # 与 main.py 中的处理方法相同：只在本协程的上下文中设置活动群
+    charmod.set_active_group(group_id)
+    fu.set_active_group(group_id)
+    for i in range(rounds):
+        name = f"{group_id}-{i}"
+        chara_id = await run_io(charmod.create_character, USER_ID, name, {"群": group_id, "轮": i})
+        await asyncio.sleep(0)
+
+        data = await run_io(charmod.get_current_character, USER_ID)
+        if not data or data["id"] != chara_id or data["attributes"].get("群") != group_id:
+            problems.append(f"{group_id} round {i}: current card is {data and data['name']!r}")
+        names = await run_io(charmod.get_all_characters, USER_ID)
+        foreign = [n for n in names if not n.startswith(f"{group_id}-")]
+        if foreign or len(names) != i + 1:
+            problems.append(f"{group_id} round {i}: card list has {len(names)} cards, foreign {foreign[:3]}")
+        await asyncio.sleep(0)
+
+        await run_io(fu.create_mark, name, 4)
+        await asyncio.sleep(0)
+        await run_io(fu.advance_mark, name, 1)
+        marks = await run_io(fu._get_marks_for_group)
+        foreign = [m.name for m in marks if not m.name.startswith(f"{group_id}-")]
+        if foreign or len(marks) != i + 1 or marks[-1].progress != 1:
+            problems.append(f"{group_id} round {i}: marks {len(marks)}, foreign {foreign[:3]}")
+        await asyncio.sleep(0)
+
+
+async def run_check(groups: int, rounds: int) -> list:
+    problems = []
+    await asyncio.gather(*(_group_worker(f"g{n:03d}", rounds, problems) for n in range(groups)))
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stress per-group isolation of character cards and fu marks.")
+    parser.add_argument("--groups", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--storage", choices=("json", "sqlite"), default="json")
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix="trpgdice-isolation-")
+    location = os.path.join(tmp, "chara.db") if args.storage == "sqlite" else tmp
+    charmod.set_store(open_store(args.storage, location))
+    try:
+        problems = asyncio.run(run_check(args.groups, args.rounds))
+    finally:
+        charmod.close_store()
+        shutdown_io()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    for problem in problems[:20]:
+        print(problem)
+    print(f"{args.groups} groups x {args.rounds} rounds ({args.storage}): {len(problems)} cross-group reads")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+import sys
+import argparse
+
+from component import dice as dice_mod
+from component.dispatch import QUICK_COMMANDS
+
+# 快捷指令与斜杠指令的掷骰一致性检查：同一表达式分别走 `.r` / `.rh`（dispatch 解析器）
+# 与 `/r` / `/rh`（AstrBot 按空白切分参数）两条路径，两者交给掷骰模块的表达式必须相同，
+# 且结果符合预期（确定的表达式核对总和，除以 0 必须报错）。另外核对 表达式 + 备注 的拆分。
+# 在插件根目录执行：
+#   python -m tools.roll_parity_check
+# 全部一致时退出码为 0，否则为 1。
+
+# (表达式, 期望总和 或 None, 是否应报错)
+CASES = (
+    ("2+3*4", 14, False),
+    ("(2d6+6)*5", None, False),
+    ("1d6/0", None, True),
+    ("10/3", 3, False),
+    ("3d6+2", None, False),
+    ("3#1d20", None, False),
+    ("1d100", None, False),
+    ("", None, False),
+)
+
+# 快捷指令原文 -> 解析器应给出的 (表达式, 备注)
+REMARK_CASES = (
+    ("r1d100 侦查", ("1d100", "侦查")),
+    ("r 2d6+3 攻击", ("2d6+3", "攻击")),
+    ("r 2d6+3攻击", ("2d6+3", "攻击")),
+    ("r (2d6+6)*5 火球", ("(2d6+6)*5", "火球")),
+    ("r 3#1d20 先攻", ("3#1d20", "先攻")),
+    ("r 侦查", (None, "侦查")),
+    ("rd20 侦查", ("1d20", "侦查")),
+    ("rd20", ("1d20", None)),
+    ("rd 侦查", (None, "侦查")),
+)
+
+
+def _quick_args(command: str, expr: str) -> tuple:
+    found, rest = QUICK_COMMANDS.match(f"{command} {expr}")
+    assert found is not None and found.name == command, f".{command} {expr} 未匹配到 {command}"
+    return found.parser(rest)
+
+
+def _slash_args(expr: str) -> tuple:
+    # AstrBot 把指令名后的文本按空白切分为位置参数
+    tokens = expr.split()
+    return tokens[0] if tokens else None, tokens[1] if len(tokens) > 1 else None
+
+
+def _dice_input(message) -> str:
+    """与 main.py 的 handle_roll_dice / roll_hidden 相同的取默认值方式，得到交给掷骰模块的表达式"""
+    return message.strip() if message else f"1d{dice_mod.DEFAULT_DICE}"
+
+
+def check() -> list:
+    """返回不一致项的说明列表（为空表示全部通过）"""
+    problems = []
+    for expr, expected, should_fail in CASES:
+        slash = _dice_input(_slash_args(expr)[0])
+        for command in ("r", "rh"):
+            label = f".{command} {expr!r}"
+            quick = _dice_input(_quick_args(command, expr)[0])
+            if quick != slash:
+                problems.append(f"{label}: quick path rolls {quick!r}, slash path rolls {slash!r}")
+                continue
+            total, text = dice_mod.parse_dice_expression(quick)
+            if should_fail and total is not None:
+                problems.append(f"{label}: expected an error, got {total}")
+            elif not should_fail and total is None:
+                problems.append(f"{label}: unexpected error {text!r}")
+            elif expected is not None and total != expected:
+                problems.append(f"{label}: expected {expected}, got {total}")
+
+    for text, expected in REMARK_CASES:
+        found, rest = QUICK_COMMANDS.match(text)
+        args = found.parser(rest) if found is not None else None
+        if args != expected:
+            problems.append(f".{text}: expected {expected}, got {args}")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare quick (.r) and slash (/r) dice rolls on the same expressions.")
+    parser.parse_args(argv)
+    problems = check()
+    for problem in problems:
+        print(problem)
+    print(f"{len(CASES) * 2 + len(REMARK_CASES)} checks, {len(problems)} mismatches")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+import os
+import sys
+import argparse
+import subprocess
+
+# 冷启动预算检查：在新的解释器中导入全部 component 模块，超出预算时退出码为 1。
+# 在插件根目录执行：
+#   python -m tools.startup_budget --budget 1.0
+# 插件运行时的逐模块导入耗时见 component/startup_profile.py（.dicestartup）。
+
+ENV_BUDGET = "TRPGDICE_STARTUP_BUDGET"
+DEFAULT_BUDGET = 1.0    # 秒
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COMPONENT_DIR = os.path.join(PLUGIN_DIR, "component")
+
+
+def component_modules() -> list:
+    return sorted(
+        f"component.{filename[:-3]}"
+        for filename in os.listdir(COMPONENT_DIR)
+        if filename.endswith(".py") and not filename.startswith("_")
+    )
+
+
+def measure_cold_import() -> float:
+    """在新的解释器中导入全部 component 模块，返回耗时（秒）"""
+    code = (
+        "import time; t = time.perf_counter()\n"
+        + "".join(f"import {name}\n" for name in component_modules())
+        + "print(time.perf_counter() - t)"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=PLUGIN_DIR, check=True, capture_output=True, text=True
+    ).stdout
+    return float(out.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the cold import time of the component package.")
+    parser.add_argument("--budget", type=float, default=float(os.environ.get(ENV_BUDGET, DEFAULT_BUDGET)),
+                        help=f"seconds (default ${ENV_BUDGET} or {DEFAULT_BUDGET})")
+    args = parser.parse_args(argv)
+    elapsed = measure_cold_import()
+    ok = elapsed <= args.budget
+    print(f"cold import of component: {elapsed * 1000:.1f} ms (budget {args.budget * 1000:.0f} ms) {'ok' if ok else 'OVER BUDGET'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())